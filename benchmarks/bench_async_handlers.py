@@ -0,0 +1,111 @@
+# benchmarks/bench_async_handlers.py
+#
+# 对比同步 Flask 视图（固定数量的工作线程）和 run_async.py 异步接口在慢上游下的并发能力
+# 用法：python -m benchmarks.bench_async_handlers [--requests 200] [--workers 8] [--latency 0.2 0.3]
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.bench_load import make_config, summarize
+from benchmarks.mock_upstream import MockUpstream
+
+
+def reservation_form(i, today):
+    return {
+        'yuyue_name': f'基准{i}',
+        'yuyue_hp': f'139{i:08d}',
+        'yuyue_time': 8 + i % 12,
+        'yuyue_riqi': today,
+        'yuyue_changguan': 2 + i % 5,
+    }
+
+
+# 同步视图：workers 个线程各自用测试客户端发请求，相当于 workers 个线程的 Web 服务
+def bench_sync(app, name, count, workers, send):
+    def timed(i):
+        client = app.test_client()
+        started = time.perf_counter()
+        response = send(client, i)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(timed, range(count)))
+    result = summarize(name, count, time.perf_counter() - started, [latency for latency, _ in results])
+    result['errors'] = sum(1 for _, status in results if status >= 400)
+    return result
+
+
+# 异步接口：单个事件循环，所有请求同时发出
+async def bench_async(app, today, count):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    results = []
+    try:
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def timed(name, method, path, data=None):
+                started = time.perf_counter()
+                async with session.request(method, f"{base_url}{path}", data=data) as response:
+                    await response.read()
+                    return time.perf_counter() - started, response.status
+
+            for name, make_request in (
+                ('async reserve', lambda i: ('POST', '/api/reserve', reservation_form(i, today))),
+                ('async cancel', lambda i: ('POST', f'/api/cancel_order/{i + 1}', None)),
+            ):
+                started = time.perf_counter()
+                timings = await asyncio.gather(*[timed(name, *make_request(i)) for i in range(count)])
+                result = summarize(name, count, time.perf_counter() - started, [latency for latency, _ in timings])
+                result['errors'] = sum(1 for _, status in timings if status >= 400)
+                results.append(result)
+    finally:
+        await runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比同步视图和异步接口在慢上游下的并发能力')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8, help='同步视图的工作线程数')
+    parser.add_argument('--latency', type=float, nargs=2, default=(0.2, 0.3), metavar=('MIN', 'MAX'))
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    upstream = MockUpstream(latency=tuple(args.latency), seed=1)
+    base_url = upstream.start_in_thread()
+
+    from yourapplication import create_app, init_db
+    from yourapplication.async_api import create_async_app
+    today = date.today().strftime('%Y-%m-%d')
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(make_config(base_url, workdir))
+        init_db(app)
+        results.append(bench_sync(app, 'sync reserve', args.requests, args.workers,
+                                  lambda client, i: client.post('/', data=reservation_form(i, today))))
+        results.append(bench_sync(app, 'sync cancel', args.requests, args.workers,
+                                  lambda client, i: client.post(f'/cancel_order/{i + 1}', data={'date': today})))
+        results.extend(asyncio.run(bench_async(create_async_app(app), today, args.requests)))
+
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+    print(f"上游请求计数：{upstream.requests}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
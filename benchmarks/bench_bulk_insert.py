@@ -0,0 +1,73 @@
+# benchmarks/bench_bulk_insert.py
+#
+# 对比逐个 db.session.add 的 ORM 写入与 insert_new_orders 的 Core 分块写入
+# 用法：python -m benchmarks.bench_bulk_insert [--sizes 1000 10000 100000]
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.bench_load import make_config
+
+
+def make_orders(count):
+    return [
+        {
+            'yuyue_id': yuyue_id,
+            'venue': '体育馆三楼羽毛球馆1号场',
+            'name': f'测试{yuyue_id}',
+            'phone': f'138{yuyue_id:08d}',
+            'date': '2026-10-18',
+            'time': '19:00-20:00;20:00-21:00',
+        }
+        for yuyue_id in range(1, count + 1)
+    ]
+
+
+# 原有实现：每行构建一个 Order 对象，最后统一提交
+def insert_orm_loop(orders):
+    from yourapplication.models import db, Order
+    for order_data in orders:
+        db.session.add(Order(**order_data))
+    db.session.commit()
+
+
+def reset_tables():
+    from yourapplication.models import db
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比 ORM 逐行写入与 Core 分块写入')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    from yourapplication import create_app
+    from yourapplication.utils import bulk_chunk_size, insert_new_orders
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(make_config('http://127.0.0.1:0', workdir))
+        with app.app_context():
+            print(f"每块行数：{bulk_chunk_size()}")
+            for size in args.sizes:
+                orders = make_orders(size)
+
+                reset_tables()
+                started = time.perf_counter()
+                insert_orm_loop(orders)
+                orm_elapsed = time.perf_counter() - started
+
+                reset_tables()
+                started = time.perf_counter()
+                timings = insert_new_orders(orders)
+                bulk_elapsed = time.perf_counter() - started
+
+                chunk_seconds = [timing['seconds'] for timing in timings]
+                print(f"{size:>7} 行：ORM {orm_elapsed:.3f}s，Core {bulk_elapsed:.3f}s"
+                      f"（{orm_elapsed / bulk_elapsed:.1f}x），{len(timings)} 块，"
+                      f"单块最长 {max(chunk_seconds) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_load.py
+#
+# 基于本地模拟上游的负载基准：范围扫描和 Flask 路由的吞吐量、p50/p99 延迟与峰值内存
+# 用法：python -m benchmarks.bench_load [--ids 300] [--requests 50] [--latency 0.02 0.1] [--json result.json]
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.mock_upstream import MockUpstream
+from config import Config
+
+
+def make_config(base_url, workdir):
+    class BenchConfig(Config):
+        DATA_DIR = os.path.join(workdir, 'data')
+        LOG_DIR = os.path.join(workdir, 'logs')
+        LOG_FILE = os.path.join(LOG_DIR, 'app.log')
+        PAGE_ARCHIVE_DIR = os.path.join(DATA_DIR, 'pages')
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(DATA_DIR, 'app.db')
+        UPSTREAM_BASE_URL = base_url
+        WTF_CSRF_ENABLED = False
+
+    os.makedirs(BenchConfig.DATA_DIR, exist_ok=True)
+    return BenchConfig
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# Linux 下 ru_maxrss 的单位是 KB
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(name, count, elapsed, latencies):
+    return {
+        'name': name,
+        'count': count,
+        'elapsed': round(elapsed, 3),
+        'per_sec': round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def bench_range_scan(app, ids, mode):
+    from yourapplication.utils import update_database_with_range
+    with app.app_context():
+        stats = update_database_with_range(1, ids, mode=mode)
+    result = summarize(f"scan[{mode}]", stats.pages, stats.elapsed, stats.latencies)
+    result.update(found=stats.found, failed=len(stats.failed_ids), peak_in_flight=stats.peak_in_flight)
+    return result
+
+
+def bench_route(name, count, send):
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(count):
+        request_started = time.perf_counter()
+        response = send(i)
+        latencies.append(time.perf_counter() - request_started)
+        if response.status_code >= 400:
+            errors += 1
+    result = summarize(name, count, time.perf_counter() - started, latencies)
+    result['errors'] = errors
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='基于本地模拟上游的负载基准')
+    parser.add_argument('--ids', type=int, default=300, help='范围扫描的 ID 数')
+    parser.add_argument('--requests', type=int, default=50, help='每个路由的请求数')
+    parser.add_argument('--latency', type=float, nargs=2, default=(0.02, 0.1), metavar=('MIN', 'MAX'))
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--mode', default='incremental', help='范围扫描的同步模式')
+    parser.add_argument('--json', help='将结果写入 JSON 文件，便于部署前对比')
+    args = parser.parse_args()
+
+    upstream = MockUpstream(latency=tuple(args.latency), error_rate=args.error_rate, max_id=args.ids, seed=1)
+    base_url = upstream.start_in_thread()
+
+    from yourapplication import create_app, init_db
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(make_config(base_url, workdir))
+        init_db(app)
+        client = app.test_client()
+        today = date.today().strftime('%Y-%m-%d')
+        results = [bench_range_scan(app, args.ids, args.mode)]
+
+        with app.app_context():
+            from yourapplication.models import Order
+            order_ids = [order.yuyue_id for order in Order.query.limit(args.requests).all()]
+
+        results.append(bench_route('view_orders', args.requests, lambda i: client.get(f'/orders?date={today}')))
+        results.append(bench_route('index', args.requests, lambda i: client.post('/', data={
+            'yuyue_name': f'基准{i}',
+            'yuyue_hp': f'139{i:08d}',
+            'yuyue_time': 8 + i % 12,
+            'yuyue_riqi': today,
+            'yuyue_changguan': 2,
+        })))
+        results.append(bench_route('cancel_order', len(order_ids), lambda i: client.post(
+            f'/cancel_order/{order_ids[i]}', data={'date': today})))
+
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+    print(f"上游请求计数：{upstream.requests}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_parse_modes.py
+#
+# 比较 inline / thread / process 三种解析方式的吞吐量和事件循环阻塞时间
+# 用法：python -m benchmarks.bench_parse_modes [--pages 2000] [--backend regex] [--batch-size 8] [--archive data/pages]
+
+import argparse
+import asyncio
+import time
+
+from yourapplication.parse_pool import PARSE_EXECUTOR_MODES, ParseBatcher, get_parse_executor, shutdown_parse_executors
+from yourapplication.parsers import PARSER_BACKENDS, parse_page
+from benchmarks.parser_diff import load_corpus
+
+
+# 每隔 interval 秒记录一次事件循环的实际延迟，反映解析对网络 I/O 的阻塞程度
+async def measure_loop_lag(stop, interval=0.001):
+    max_lag = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, loop.time() - expected)
+    return max_lag
+
+
+async def run_mode(mode, backend, contents, batch_size, workers):
+    executor = get_parse_executor(mode, workers)
+    batcher = ParseBatcher(executor, backend, batch_size) if executor else None
+
+    async def parse(content):
+        if batcher is None:
+            return parse_page(backend, content)
+        return await batcher.parse(content)
+
+    # 预热进程池，不计入启动开销
+    if batcher is not None:
+        await asyncio.gather(*(parse(content) for content in contents[:batch_size * 4]))
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(parse(content) for content in contents))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    max_lag = await lag_task
+    parsed = sum(1 for fields, _ in results if fields)
+    return elapsed, max_lag, parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较不同解析执行方式的吞吐量')
+    parser.add_argument('--pages', type=int, default=2000, help='生成的页面数')
+    parser.add_argument('--backend', choices=list(PARSER_BACKENDS), default='bs4')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--archive', help='页面归档目录（如 data/pages），加入其中的真实页面')
+    args = parser.parse_args()
+
+    # 只保留审核通过的页面，其余页面在事件循环中即被过滤，不会进入执行器
+    contents = [content for _, content in load_corpus(args.pages, args.archive) if '审核通过' in content]
+    print(f"解析器：{args.backend}，页面数：{len(contents)}，批大小：{args.batch_size}")
+    for mode in PARSE_EXECUTOR_MODES:
+        elapsed, max_lag, parsed = asyncio.run(run_mode(mode, args.backend, contents, args.batch_size, args.workers))
+        print(f"{mode:>8}: {len(contents) / elapsed:8.1f} 页/秒，事件循环最大延迟 {max_lag * 1000:7.1f}ms，成功 {parsed}")
+    shutdown_parse_executors()
+
+
+if __name__ == '__main__':
+    main()
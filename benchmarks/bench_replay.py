@@ -0,0 +1,79 @@
+# benchmarks/bench_replay.py
+#
+# 页面归档基准：先经模拟上游扫描一遍（同时写入归档），再用 replay 模式从归档重建订单表，
+# 对比两者的吞吐量，并测量归档的压缩率和单个页面的随机读取延迟
+# 用法：python -m benchmarks.bench_replay [--ids 2000] [--latency 0.02 0.1] [--lookups 1000] [--json result.json]
+
+import argparse
+import json
+import random
+import tempfile
+import time
+
+from benchmarks.bench_load import make_config, percentile, summarize
+from benchmarks.mock_upstream import MockUpstream
+
+
+def order_snapshot():
+    from yourapplication.models import Order
+    return sorted((order.yuyue_id, order.venue, order.name, order.phone, order.date, order.time)
+                  for order in Order.query.all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='页面归档与 replay 模式的基准')
+    parser.add_argument('--ids', type=int, default=2000, help='扫描的 ID 数')
+    parser.add_argument('--latency', type=float, nargs=2, default=(0.02, 0.1), metavar=('MIN', 'MAX'))
+    parser.add_argument('--lookups', type=int, default=1000, help='随机读取单个页面的次数')
+    parser.add_argument('--json', help='将结果写入 JSON 文件，便于部署前对比')
+    args = parser.parse_args()
+
+    upstream = MockUpstream(latency=tuple(args.latency), max_id=args.ids, seed=1)
+    base_url = upstream.start_in_thread()
+
+    from yourapplication import create_app, init_db
+    from yourapplication.page_archive import get_page_archive
+    from yourapplication.utils import delete_all_orders, update_database_with_range
+    with tempfile.TemporaryDirectory() as workdir:
+        config = make_config(base_url, workdir)
+        config.LOG_TO_STDERR = False
+        app = create_app(config)
+        init_db(app)
+        with app.app_context():
+            archive = get_page_archive()
+            fetched = update_database_with_range(1, args.ids, mode='incremental')
+            expected = order_snapshot()
+
+            # 清空订单后完全依靠归档重建
+            delete_all_orders()
+            replayed = update_database_with_range(1, args.ids, mode='replay')
+            matches = order_snapshot() == expected
+
+            ids = list(range(1, args.ids + 1))
+            raw_bytes = sum(len(content.encode('utf-8')) for _, _, content in archive.iter_pages(ids))
+            lookup_latencies = []
+            for yuyue_id in random.Random(1).choices(ids, k=args.lookups):
+                started = time.perf_counter()
+                archive.get(yuyue_id)
+                lookup_latencies.append(time.perf_counter() - started)
+            archive_stats = archive.stats_snapshot()
+
+    results = [
+        {**summarize('scan[incremental]', fetched.pages, fetched.elapsed, fetched.latencies),
+         'found': fetched.found, 'written': fetched.written},
+        {**summarize('scan[replay]', replayed.pages, replayed.elapsed, replayed.latencies),
+         'found': replayed.found, 'written': replayed.written, 'matches_network_scan': matches},
+        {'name': 'archive', **archive_stats, 'raw_bytes': raw_bytes,
+         'compression_ratio': round(raw_bytes / archive_stats['segment_bytes'], 2) if archive_stats['segment_bytes'] else 0.0,
+         'lookup_p50_ms': round(percentile(lookup_latencies, 50) * 1000, 3),
+         'lookup_p99_ms': round(percentile(lookup_latencies, 99) * 1000, 3)},
+    ]
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
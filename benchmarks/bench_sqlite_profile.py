@@ -0,0 +1,88 @@
+# benchmarks/bench_sqlite_profile.py
+#
+# 并发读写吞吐量对比：启用 / 不启用 SQLite 性能配置（WAL、PRAGMA、连接池）
+# 用法：python -m benchmarks.bench_sqlite_profile [--rows 10000] [--readers 8] [--seconds 5]
+
+import argparse
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_bulk_insert import make_orders
+from benchmarks.bench_load import make_config
+
+
+def run_profile(tuning, rows, readers, seconds):
+    from yourapplication import create_app, init_db
+    from yourapplication.models import db, Order
+    from yourapplication.utils import insert_new_orders, upsert_orders
+
+    with tempfile.TemporaryDirectory() as workdir:
+        config = make_config('http://127.0.0.1:0', workdir)
+        config.SQLITE_TUNING = tuning
+        if not tuning:
+            config.SQLALCHEMY_ENGINE_OPTIONS = {}
+        app = create_app(config)
+        init_db(app)
+        orders = make_orders(rows)
+        with app.app_context():
+            insert_new_orders(orders)
+
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        # 模拟 /orders 的查询
+        def reader():
+            with app.app_context():
+                while time.monotonic() < deadline:
+                    try:
+                        Order.query.filter(Order.date == '2026-10-18').order_by(Order.venue, Order.time).limit(500).all()
+                        count('reads')
+                    except Exception:
+                        count('errors')
+                    finally:
+                        db.session.remove()
+
+        # 模拟增量同步：每次改动一块订单并提交
+        def writer():
+            with app.app_context():
+                round_no = 0
+                while time.monotonic() < deadline:
+                    round_no += 1
+                    start = (round_no * 200) % rows
+                    chunk = [dict(order, name=f"{order['name']}-{round_no}") for order in orders[start:start + 200]]
+                    if upsert_orders(chunk):
+                        count('writes')
+                    else:
+                        count('errors')
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比 SQLite 性能配置下的并发读写吞吐量')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    for tuning in (False, True):
+        counts = run_profile(tuning, args.rows, args.readers, args.seconds)
+        label = '性能配置' if tuning else '默认配置'
+        print(f"{label}：读 {counts['reads'] / args.seconds:.1f} 次/秒，"
+              f"写 {counts['writes'] / args.seconds:.1f} 块/秒，错误 {counts['errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/bench_startup.py
+#
+# 启动耗时基准：在新的解释器中导入应用并执行 create_app，统计各阶段耗时，
+# 并用 python -X importtime 列出累计导入耗时最多的顶层包和本项目模块
+# 用法：python -m benchmarks.bench_startup [--runs 5] [--top 10] [--json result.json]
+#
+# 本模块顶层只导入标准库，避免子进程测量时把基准自身的依赖算进去
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# 不应出现在启动路径上的依赖，第一次用到时才导入
+HEAVY_MODULES = ('faker', 'requests', 'bs4', 'aiohttp')
+
+
+# 子进程：导入应用并创建，输出各阶段耗时
+def run_child(workdir):
+    started = time.perf_counter()
+    from config import Config
+    from yourapplication import create_app
+    imported = time.perf_counter()
+
+    class StartupConfig(Config):
+        DATA_DIR = os.path.join(workdir, 'data')
+        LOG_DIR = os.path.join(workdir, 'logs')
+        LOG_FILE = os.path.join(LOG_DIR, 'app.log')
+        PAGE_ARCHIVE_DIR = os.path.join(DATA_DIR, 'pages')
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(DATA_DIR, 'app.db')
+        LOG_TO_STDERR = False
+
+    create_app(StartupConfig)
+    created = time.perf_counter()
+    print(json.dumps({
+        'import_ms': round((imported - started) * 1000, 1),
+        'create_app_ms': round((created - imported) * 1000, 1),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def spawn(workdir, *python_args):
+    command = [sys.executable, *python_args, '-m', 'benchmarks.bench_startup', '--child', workdir]
+    started = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    return json.loads(result.stdout.strip().splitlines()[-1]), wall_ms, result.stderr
+
+
+# 解析 -X importtime 的输出，返回各顶层包和本项目模块的 (累计耗时 ms, 模块名)
+def top_imports(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if '.' not in name or name.startswith('yourapplication.'):
+            modules.append((int(cumulative) / 1000, name))
+    return sorted(modules, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='应用冷启动耗时基准')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='列出的模块数')
+    parser.add_argument('--json', help='将结果写入 JSON 文件，便于部署前对比')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.runs):
+            timings, wall_ms, _ = spawn(workdir)
+            runs.append({**timings, 'wall_ms': round(wall_ms, 1)})
+        _, _, importtime = spawn(workdir, '-X', 'importtime')
+
+    result = {
+        'runs': args.runs,
+        'wall_ms': round(statistics.median(run['wall_ms'] for run in runs), 1),
+        'import_ms': round(statistics.median(run['import_ms'] for run in runs), 1),
+        'create_app_ms': round(statistics.median(run['create_app_ms'] for run in runs), 1),
+        'heavy_modules': runs[-1]['heavy_modules'],
+        'top_imports': [{'module': name, 'ms': round(ms, 1)} for ms, name in top_imports(importtime)[:args.top]],
+    }
+    print(f"启动耗时（{args.runs} 次中位数）：进程 {result['wall_ms']}ms，导入 {result['import_ms']}ms，"
+          f"create_app {result['create_app_ms']}ms")
+    print(f"启动时已加载的重量级依赖：{result['heavy_modules'] or '无'}")
+    for item in result['top_imports']:
+        print(f"{item['ms']:>8.1f}ms  {item['module']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
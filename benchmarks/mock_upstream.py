@@ -0,0 +1,181 @@
+# benchmarks/mock_upstream.py
+#
+# cgyytyb 上游接口的本地模拟服务，用于基准测试和本地联调
+# 用法：python -m benchmarks.mock_upstream --port 18999 --latency 0.05 0.2 --error-rate 0.02
+# 然后设置 UPSTREAM_BASE_URL=http://127.0.0.1:18999 启动应用
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import random
+import secrets
+import threading
+import time
+from datetime import date, timedelta
+
+from aiohttp import web
+
+from benchmarks.pages import random_order_page, render_order_page
+from config import Config
+
+YUYUE_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>场馆预约</title></head>
+<body>
+<form id="yuyue-form">
+    <input type="hidden" name="changguan" value="{changguan}">
+    <input type="hidden" name="yyp_pass" value="{yyp_pass}">
+</form>
+</body></html>
+'''
+
+
+class MockUpstream:
+    def __init__(self, latency=(0.0, 0.0), error_rate=0.0, max_id=5000,
+                 status_weights=None, approve_after=0.0, token_ttl=None, etags=False, seed=None):
+        self.latency = latency  # 每个请求的随机延迟区间（秒）
+        self.error_rate = error_rate  # 返回 500 的概率
+        self.max_id = max_id  # 超过该 ID 的预约视为不存在
+        self.status_weights = status_weights  # approved / pending / cancelled 的比例
+        self.approve_after = approve_after  # 新建预约经过多少秒后变为审核通过
+        self.token_ttl = token_ttl  # yyp_pass 的有效期（秒），为 None 时任何非空值都有效
+        self.tokens = {}  # 已发放的 yyp_pass -> 发放时间
+        self.etags = etags  # 订单页面是否返回 ETag 并支持 If-None-Match
+        self.rng = random.Random(seed)
+        today = date.today()
+        self.dates = [(today + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(-1, 3)]
+        self.venues = list(Config.CHANGGUAN_OPTIONS.values())
+        self.next_yuyue_id = itertools.count(max_id + 1)
+        self.reservations = {}  # 通过 saveYuyue 新建的预约
+        self.requests = {}  # 各接口的请求计数
+
+    async def simulate(self, endpoint):
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        low, high = self.latency
+        if high > 0:
+            await asyncio.sleep(self.rng.uniform(low, high))
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise web.HTTPInternalServerError(text='mock upstream error')
+
+    async def yuyue_in(self, request):
+        await self.simulate('yuyueIn')
+        yuyue_id = int(request.query.get('id', 0))
+        if yuyue_id in self.reservations:
+            reservation = dict(self.reservations[yuyue_id])
+            created_at = reservation.pop('created_at')
+            if reservation['status'] == 'pending' and time.monotonic() - created_at >= self.approve_after:
+                reservation['status'] = 'approved'
+            content = render_order_page(**reservation)
+        elif 0 < yuyue_id <= self.max_id:
+            content = random_order_page(yuyue_id, self.venues, self.dates, self.status_weights)
+        else:
+            content = render_order_page('', '', '', '', '', status='missing')
+        if self.etags:
+            etag = '"%s"' % hashlib.md5(content.encode('utf-8')).hexdigest()
+            if request.headers.get('If-None-Match') == etag:
+                self.requests['yuyueIn 304'] = self.requests.get('yuyueIn 304', 0) + 1
+                return web.Response(status=304, headers={'ETag': etag})
+            return web.Response(text=content, content_type='text/html', headers={'ETag': etag})
+        return web.Response(text=content, content_type='text/html')
+
+    async def yuyue(self, request):
+        await self.simulate('yuyue')
+        yyp_pass = secrets.token_hex(8)
+        self.tokens[yyp_pass] = time.monotonic()
+        content = YUYUE_PAGE.format(changguan=request.query.get('id', ''), yyp_pass=yyp_pass)
+        return web.Response(text=content, content_type='text/html')
+
+    def valid_token(self, yyp_pass):
+        if not yyp_pass:
+            return False
+        if self.token_ttl is None:
+            return True
+        issued_at = self.tokens.get(yyp_pass)
+        return issued_at is not None and time.monotonic() - issued_at < self.token_ttl
+
+    async def save_yuyue(self, request):
+        await self.simulate('saveYuyue')
+        form = await request.post()
+        if not self.valid_token(form.get('yyp_pass')):
+            return web.json_response({'Code': '1', 'Msg': '预约密钥无效'})
+        yuyue_id = next(self.next_yuyue_id)
+        changguan = int(form.get('yuyue_changguan', 0))
+        hour = int(form.get('yuyue_time', 0))
+        self.reservations[yuyue_id] = {
+            'venue': Config.CHANGGUAN_OPTIONS.get(changguan, '未知场馆'),
+            'name': form.get('yuyue_name', ''),
+            'phone': form.get('yuyue_hp', ''),
+            'date': form.get('yuyue_riqi', ''),
+            'time': f"{hour}:00-{hour + 1}:00",
+            'status': 'pending',
+            'created_at': time.monotonic(),
+        }
+        return web.json_response({'Code': '0', 'Msg': '预约成功', 'data': {'yuyue_id': str(yuyue_id)}})
+
+    async def tuikuan(self, request):
+        await self.simulate('tuikuan')
+        form = await request.post()
+        yuyue_id = int(form.get('tuikuan_id', 0))
+        if yuyue_id in self.reservations:
+            self.reservations[yuyue_id]['status'] = 'cancelled'
+        return web.json_response({'Code': '0', 'Msg': '取消成功'})
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get('/wap/yuyueIn', self.yuyue_in)
+        app.router.add_get('/wap/yuyue', self.yuyue)
+        app.router.add_post('/inc/ajax/save/saveYuyue', self.save_yuyue)
+        app.router.add_post('/inc/ajax/save/tuikuan', self.tuikuan)
+        return app
+
+    # 在后台线程中启动服务，返回基础地址，供基准测试在同一进程中使用
+    def start_in_thread(self, host='127.0.0.1', port=0):
+        started = threading.Event()
+        address = {}
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            runner = web.AppRunner(self.make_app(), access_log=None)
+            loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, host, port)
+            loop.run_until_complete(site.start())
+            address['port'] = runner.addresses[0][1]
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name='mock-upstream', daemon=True).start()
+        started.wait()
+        return f"http://{host}:{address['port']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='cgyytyb 上游接口的本地模拟服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18999)
+    parser.add_argument('--latency', type=float, nargs=2, default=(0.05, 0.2), metavar=('MIN', 'MAX'))
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-id', type=int, default=5000)
+    parser.add_argument('--approved', type=float, default=0.6, help='审核通过页面的比例，其余在等待审核和已取消之间平分')
+    parser.add_argument('--approve-after', type=float, default=0.0, help='新建预约多少秒后审核通过')
+    parser.add_argument('--token-ttl', type=float, default=None, help='yyp_pass 的有效期（秒），默认不过期')
+    parser.add_argument('--etags', action='store_true', help='订单页面返回 ETag 并支持条件请求')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    rest = (1 - args.approved) / 2
+    upstream = MockUpstream(
+        latency=tuple(args.latency),
+        error_rate=args.error_rate,
+        max_id=args.max_id,
+        status_weights={'approved': args.approved, 'pending': rest, 'cancelled': rest},
+        approve_after=args.approve_after,
+        token_ttl=args.token_ttl,
+        etags=args.etags,
+        seed=args.seed,
+    )
+    web.run_app(upstream.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
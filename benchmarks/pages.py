@@ -0,0 +1,71 @@
+# benchmarks/pages.py
+
+import random
+from html import escape
+
+# 生成与 cgyytyb 详情页结构一致的模拟页面，供解析器对比、模拟服务和基准测试使用
+
+ORDER_PAGE = '''<!DOCTYPE html>
+<html>
+<head><meta charset="UTF-8"><title>预约详情</title></head>
+<body>
+<div class="weui-cells__title">预约信息</div>
+<div class="status">{status}</div>
+<div class="weui-cells weui-cells_form">
+    <div class="weui-cell">
+        <label class="weui-label">预约场馆</label>
+        <div class="weui-cell__bd">{venue}</div>
+    </div>
+    <div class="weui-cell">
+        <label class="weui-label">预约姓名</label>
+        <div class="weui-cell__bd">{name}<span style="margin-left:1rem">{phone}</span></div>
+    </div>
+    <div class="weui-cell">
+        <label class="weui-label">预约时间</label>
+        <p><span style="font-weight:600;margin-right:1rem">{date}</span><em>{time}</em></p>
+    </div>
+</div>
+</body>
+</html>
+'''
+
+MISSING_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>预约详情</title></head>
+<body><div class="weui-msg">预约不存在</div></body></html>
+'''
+
+STATUS_TEXT = {
+    'approved': '审核通过，可以进场',
+    'pending': '等待审核',
+    'cancelled': '预约已取消',
+}
+
+
+def render_order_page(venue, name, phone, date, time, status='approved'):
+    if status == 'missing':
+        return MISSING_PAGE
+    return ORDER_PAGE.format(
+        status=STATUS_TEXT[status],
+        venue=escape(venue),
+        name=escape(name),
+        phone=escape(phone),
+        date=escape(date),
+        time=escape(time),
+    )
+
+
+# 按 yuyue_id 确定性地生成一页，status_weights 控制审核通过/未通过的比例
+def random_order_page(yuyue_id, venues, dates, status_weights=None):
+    rng = random.Random(yuyue_id)
+    status_weights = status_weights or {'approved': 0.6, 'pending': 0.2, 'cancelled': 0.2}
+    status = rng.choices(list(status_weights), weights=list(status_weights.values()))[0]
+    hour = rng.randint(8, 21)
+    slots = ';'.join(f"{h}:00-{h + 1}:00" for h in range(hour, hour + rng.randint(1, 2)))
+    return render_order_page(
+        venue=rng.choice(venues),
+        name=f"测试{yuyue_id}",
+        phone=f"138{yuyue_id % 100000000:08d}",
+        date=rng.choice(dates),
+        time=slots,
+        status=status,
+    )
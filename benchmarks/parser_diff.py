@@ -0,0 +1,85 @@
+# benchmarks/parser_diff.py
+#
+# 对比正则解析器与 BeautifulSoup 解析器在页面样本上的输出，并测量两者的耗时
+# 用法：python -m benchmarks.parser_diff [--generated 500] [--repeat 3] [--archive data/pages]
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+from yourapplication.parsers import APPROVED_MARKER, PARSER_BACKENDS, parse_order_regex
+from benchmarks.pages import random_order_page
+from config import Config
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'corpus')
+
+
+# archive 为页面归档目录时，另外加入其中每个 ID 最近一次抓取的真实页面
+def load_corpus(generated, archive=None):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+    if archive:
+        from yourapplication.page_archive import PageArchive
+        page_archive = PageArchive(archive)
+        pages += [(f"archive-{yuyue_id}", content)
+                  for yuyue_id, _, content in page_archive.iter_pages(page_archive.ids())]
+    venues = list(Config.CHANGGUAN_OPTIONS.values())
+    dates = ['2026-10-18', '2026-10-19', '2026-10-20']
+    for yuyue_id in range(1, generated + 1):
+        pages.append((f"generated-{yuyue_id}", random_order_page(yuyue_id, venues, dates)))
+    return pages
+
+
+# 与 extract_order_info 一致：未审核通过的页面不解析，解析异常视为 None
+def run_parser(parse_order, content):
+    if APPROVED_MARKER not in content:
+        return None
+    try:
+        return parse_order(content)
+    except Exception:
+        return None
+
+
+def time_parser(parse_order, pages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for _, content in pages:
+            run_parser(parse_order, content)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比正则解析器与 BeautifulSoup 解析器')
+    parser.add_argument('--generated', type=int, default=500, help='额外生成的随机页面数')
+    parser.add_argument('--repeat', type=int, default=3, help='计时时重复解析的轮数')
+    parser.add_argument('--archive', help='页面归档目录（如 data/pages），加入其中的真实页面')
+    args = parser.parse_args()
+
+    pages = load_corpus(args.generated, args.archive)
+    reference = PARSER_BACKENDS['bs4']
+    mismatches = 0
+    fallbacks = 0
+    for name, content in pages:
+        expected = run_parser(reference, content)
+        for backend, parse_order in PARSER_BACKENDS.items():
+            actual = run_parser(parse_order, content)
+            if actual != expected:
+                mismatches += 1
+                print(f"[不一致] {name} {backend}: {actual!r} != {expected!r}")
+        if APPROVED_MARKER in content and parse_order_regex(content) is None:
+            fallbacks += 1
+
+    print(f"页面数：{len(pages)}，不一致：{mismatches}，正则回退 BeautifulSoup：{fallbacks}")
+    for backend, parse_order in PARSER_BACKENDS.items():
+        elapsed = time_parser(parse_order, pages, args.repeat)
+        per_page = elapsed / (len(pages) * args.repeat) * 1e6
+        print(f"{backend:>6}: {elapsed:.3f}s，每页 {per_page:.1f}µs")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
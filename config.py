@@ -13,8 +13,136 @@ class Config:
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(DATA_DIR, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite 性能配置：每个新连接建立时执行的 PRAGMA，设为 False 则保持 SQLite 默认值
+    SQLITE_TUNING = True
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',  # 写入不阻塞读取
+        'synchronous': 'NORMAL',  # WAL 模式下安全且减少 fsync
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # 负数单位为 KB，即 64MB
+        'busy_timeout': 5000,  # 毫秒，遇到写锁时等待而不是立即报错
+        'temp_store': 'MEMORY',
+    }
+    # 多线程服务器下的连接池配置
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'connect_args': {'check_same_thread': False, 'timeout': 5},
+    }
+
     # 日志配置
     LOG_FILE = os.path.join(LOG_DIR, 'app.log')
+    LOG_FORMAT = 'json'  # json：每行一条 JSON 记录；text：原有的文本格式
+    LOG_LEVEL = 'INFO'
+    LOG_LEVELS = {}  # 按模块调整级别，如 {'yourapplication.utils': 'WARNING'}
+    LOG_TO_STDERR = True
+    LOG_SAMPLE_LIMIT = 20  # 一次扫描中同类逐 ID 日志最多输出的条数，其余只计数
+
+    # 表单留空时使用的随机姓名和手机号，预先生成、不足时补充
+    FAKE_LOCALE = 'zh_CN'
+    FAKE_POOL_SIZE = 256
+    FAKE_POOL_REFILL_AT = 64
+
+    # /metrics 指标：路由、上游调用、范围扫描和 SQL 查询的耗时
+    METRICS_ENABLED = True
+    METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # 直方图区间上界（秒）
+
+    # 上游服务地址（基准测试时可指向本地模拟服务）
+    UPSTREAM_BASE_URL = os.environ.get('UPSTREAM_BASE_URL') or 'https://cgyytyb.cpu.edu.cn'
+
+    # 订单抓取配置
+    FETCH_CONCURRENCY = 20  # 同时进行中的请求上限
+    FETCH_LIMIT_PER_HOST = 20  # 连接池对单个主机的连接上限
+    FETCH_KEEPALIVE_TIMEOUT = 30  # 空闲连接保活时间（秒）
+    FETCH_TIMEOUT = 20  # 单次请求超时（秒）
+
+    # 抓取重试：只重试以下状态码和网络错误，等待时间按指数退避并加随机抖动
+    FETCH_MAX_ATTEMPTS = 5
+    FETCH_BACKOFF_BASE = 0.5  # 秒
+    FETCH_BACKOFF_MAX = 30  # 秒
+    FETCH_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    # 抓取限速：一次扫描内所有请求共用的令牌桶，为 None 时不限速
+    FETCH_RATE_LIMIT = 50  # 每秒请求数
+    FETCH_RATE_BURST = 20
+
+    # 熔断：最近 BREAKER_WINDOW 次请求中失败比例达到 BREAKER_FAILURE_RATE 时暂停扫描
+    BREAKER_WINDOW = 50
+    BREAKER_FAILURE_RATE = 0.5
+    BREAKER_MIN_CALLS = 20
+    BREAKER_COOLDOWN = 30  # 秒
+
+    # 记录每个 yuyue_id 的页面指纹，重复扫描时跳过未变化的页面
+    PAGE_CACHE_ENABLED = True
+
+    # 抓取到的 yuyueIn 原始页面归档（压缩分段文件 + 索引），用于不联网的 replay 同步模式
+    PAGE_ARCHIVE_ENABLED = True
+    PAGE_ARCHIVE_DIR = os.path.join(DATA_DIR, 'pages')
+    PAGE_ARCHIVE_SEGMENT_SIZE = 64 * 1024 * 1024  # 单个分段文件的大小上限（字节）
+    PAGE_ARCHIVE_COMPRESS_LEVEL = 6  # zlib 压缩级别
+
+    # 预约、取消等同步上游请求的共享连接池
+    UPSTREAM_POOL_SIZE = 10  # 连接池大小，不小于 Web 服务的工作线程数
+    UPSTREAM_CONNECT_TIMEOUT = 3.05  # 秒
+    UPSTREAM_READ_TIMEOUT = 10  # 秒
+    UPSTREAM_LATENCY_WINDOW = 1000  # 每个接口保留最近多少次请求的耗时
+    ASYNC_UPSTREAM_LIMIT = 100  # 异步接口（run_async.py）到上游的连接上限
+
+    # 批量取消：同时进行的 tuikuan 请求数（不超过 UPSTREAM_POOL_SIZE）和单次最多取消的订单数
+    BATCH_CANCEL_CONCURRENCY = 8
+    BATCH_CANCEL_MAX_IDS = 200
+
+    # 每个场馆的 yyp_pass 缓存时间（秒），为 0 时每次预约都重新获取
+    YYP_PASS_TTL = 60
+    # saveYuyue 被拒绝且提示信息含其中任一文字时，视为 yyp_pass 失效：作废缓存并重新获取后再提交一次；
+    # 其他拒绝（时段已满、重复预约等）直接返回，不重复提交
+    YYP_PASS_INVALID_MARKERS = ('密钥', 'yyp_pass')
+
+    # 详情页解析器：regex（正则快速解析，结构不符时回退 BeautifulSoup）或 bs4
+    ORDER_PARSER = 'regex'
+
+    # 解析执行方式：inline（事件循环内）、thread（线程池）、process（进程池）
+    PARSE_EXECUTOR = 'inline'
+    PARSE_WORKERS = None  # 工作线程/进程数，None 表示按 CPU 核数
+    PARSE_BATCH_SIZE = 8  # 每次提交给执行器的页面数
+
+    # 增量同步每次提交的行数
+    SYNC_CHUNK_SIZE = 200
+
+    # 批量写入时每块的最大行数（同时按 SQLite 参数上限折算）
+    BULK_INSERT_CHUNK_SIZE = 500
+
+    # 后台同步任务保留的历史记录数量
+    SYNC_JOB_HISTORY = 50
+    # 单次联网同步的范围上限（结束ID - 起始ID），合并排队中的任务时也不超过该值；replay 不受限制
+    SYNC_MAX_RANGE = 1000
+
+    # 数据保留：预约日期早于 RETENTION_DAYS 天前的订单和预约分批移到归档表
+    # 后台同步任务结束后，距上次归档超过 RETENTION_INTERVAL 秒时顺带执行；为 None 时只能用 flask archive-orders 手动执行
+    RETENTION_DAYS = 30
+    RETENTION_BATCH_SIZE = 500  # 每个事务移动的行数，避免长时间持有写锁
+    RETENTION_INTERVAL = 6 * 3600
+    RETENTION_VACUUM_FREE_RATIO = 0.2  # 空闲页占比达到该值时执行 VACUUM 回收空间，否则只执行 ANALYZE
+
+    # /api/orders 的分页和进程内缓存
+    API_PAGE_SIZE = 50
+    API_MAX_PAGE_SIZE = 500
+    ORDERS_CACHE_SIZE = 128  # 缓存的筛选条件组合数量
+    ORDERS_CACHE_TTL = 60  # 秒
+
+    # /orders/stream：订单页面通过 Server-Sent Events 接收订单变更，按行更新表格
+    ORDER_EVENTS_ENABLED = True
+    ORDER_EVENTS_HEARTBEAT = 15  # 没有事件时发送保活注释的间隔（秒），也用于发现已断开的连接
+    ORDER_EVENTS_BUFFER = 256  # 保留最近多少条事件，供断线重连时补发
+    ORDER_EVENTS_QUEUE_SIZE = 100  # 每个连接积压的事件上限，超过后通知页面整体刷新
+    ORDER_EVENTS_MAX_SUBSCRIBERS = 50  # 同时打开的推送连接上限，每个连接占用一个工作线程
+
+    # 自动同步配置
+    AUTO_SYNC_MAX_MISSES = 20  # 最后一次命中后连续未命中多少个 ID 即停止
+    AUTO_SYNC_LOOKBACK = 50  # 每次复查水位线之前多少个 ID（等待审核的预约）
+    AUTO_SYNC_MAX_IDS = 1000  # 单次向后扫描的 ID 上限
+    TERMINAL_PAGE_MARKERS = ('已取消', '已退款')  # 出现即视为预约已终结的页面文字
 
     # 请求头配置
     HEADERS = {
@@ -47,6 +175,38 @@ class Config:
         23: "体育场跆拳道房",
     }
 
+    # 场馆分组，分组和组内场馆的先后顺序即订单页面的排序顺序
+    VENUE_GROUPS = {
+        '体育馆三楼羽毛球馆': [
+            '体育馆三楼羽毛球馆1号场',
+            '体育馆三楼羽毛球馆2号场',
+            '体育馆三楼羽毛球馆3号场',
+            '体育馆三楼羽毛球馆4号场',
+            '体育馆三楼羽毛球馆5号场',
+            '体育馆三楼羽毛球馆6号场',
+            '体育馆三楼羽毛球馆7号场',
+        ],
+        '体育馆一楼羽毛球馆': [
+            '体育馆一楼羽毛球馆1号场',
+            '体育馆一楼羽毛球馆2号场',
+            '体育馆一楼羽毛球馆3号场',
+            '体育馆一楼羽毛球馆4号场',
+            '体育馆一楼羽毛球馆5号场',
+            '体育馆一楼羽毛球馆6号场',
+        ],
+        '教室': [
+            '体育馆一楼教室一',
+            '体育馆一楼教室二',
+            '体育馆一楼教室三',
+            '体育馆四楼教室四',
+            '体育场形体房',
+            '体育场跆拳道房',
+        ],
+        '田径场健身房': [
+            '田径场健身房',
+        ],
+    }
+
     # 姓名和 openid 映射
     NAME_OPENID_MAP = {
         "高利明": "odBu7wrvL6I4doCdkFcqm6j0Ng8E",
@@ -1,6 +1,9 @@
 # run.py
 
 from app import app
+from yourapplication import init_db
 
 if __name__ == '__main__':
+    # 直接运行开发服务器时顺带建表；生产部署请先执行 flask init-db
+    init_db(app)
     app.run(host='0.0.0.0', port=18888, debug=False)
@@ -0,0 +1,13 @@
+# run_async.py
+#
+# 预约和取消的异步接口（/api/reserve、/api/cancel_order/<id>），与 run.py 的 Flask 服务共用配置和数据库
+
+from aiohttp import web
+
+from app import app
+from yourapplication import init_db
+from yourapplication.async_api import create_async_app
+
+if __name__ == '__main__':
+    init_db(app)
+    web.run_app(create_async_app(app), host='0.0.0.0', port=18889)
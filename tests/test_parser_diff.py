@@ -0,0 +1,18 @@
+# tests/test_parser_diff.py
+#
+# 与 benchmarks/parser_diff.py 相同的差分检查：每个解析器在页面样本（corpus 目录和随机生成的页面）上
+# 的输出都必须与 BeautifulSoup 解析器一致
+
+import pytest
+
+from benchmarks.parser_diff import load_corpus, run_parser
+from yourapplication.parsers import PARSER_BACKENDS
+
+PAGES = load_corpus(generated=200)
+
+
+@pytest.mark.parametrize('backend', [name for name in PARSER_BACKENDS if name != 'bs4'])
+@pytest.mark.parametrize('name,content', PAGES, ids=[name for name, _ in PAGES])
+def test_parser_matches_bs4(backend, name, content):
+    expected = run_parser(PARSER_BACKENDS['bs4'], content)
+    assert run_parser(PARSER_BACKENDS[backend], content) == expected
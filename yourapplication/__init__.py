@@ -2,10 +2,9 @@
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from config import Config
 import os
-import logging
-from logging.handlers import RotatingFileHandler
 
 db = SQLAlchemy()
 
@@ -16,21 +15,59 @@ def create_app(config_class=Config):
     # 初始化数据库
     db.init_app(app)
 
+    # 指标，需在上游客户端之前创建
+    from yourapplication.metrics import init_metrics
+    init_metrics(app)
+
+    # 场馆目录，启动时构建一次
+    from yourapplication.venues import VenueCatalog
+    app.extensions['venues'] = VenueCatalog.from_config(app.config)
+
+    # 预约、取消等同步上游请求共用的连接池
+    from yourapplication.upstream import UpstreamClient, YypPassCache
+    app.extensions['upstream'] = UpstreamClient.from_config(app.config, metrics=app.extensions['metrics'])
+    app.extensions['yyp_pass_cache'] = YypPassCache(ttl=app.config['YYP_PASS_TTL'])
+
+    # 表单留空时使用的随机姓名和手机号
+    from yourapplication.fake_pool import FakeIdentityPool
+    app.extensions['fake_pool'] = FakeIdentityPool.from_config(app.config)
+
+    # 原始页面归档，第一次写入时才创建目录和文件
+    from yourapplication.page_archive import PageArchive
+    app.extensions['page_archive'] = PageArchive.from_config(app.config) if app.config['PAGE_ARCHIVE_ENABLED'] else None
+
+    # 后台同步任务队列
+    from yourapplication.jobs import SyncJobQueue
+    app.extensions['sync_jobs'] = SyncJobQueue(app, history=app.config['SYNC_JOB_HISTORY'],
+                                               max_range=app.config['SYNC_MAX_RANGE'])
+
+    # 订单列表接口的进程内缓存
+    from yourapplication.cache import TTLCache
+    app.extensions['orders_cache'] = TTLCache(maxsize=app.config['ORDERS_CACHE_SIZE'], ttl=app.config['ORDERS_CACHE_TTL'])
+
+    # 订单变更推送
+    from yourapplication.order_events import OrderEventBroker
+    app.extensions['order_events'] = OrderEventBroker.from_config(app.config) if app.config['ORDER_EVENTS_ENABLED'] else None
+
     # 注册蓝图
     from yourapplication.views import main_bp
     app.register_blueprint(main_bp)
 
-    # 配置日志
-    configure_logging(app)
+    # 注册命令行命令
+    from yourapplication.commands import register_commands
+    register_commands(app)
 
     # 创建数据和日志目录
     os.makedirs(app.config['DATA_DIR'], exist_ok=True)
     os.makedirs(app.config['LOG_DIR'], exist_ok=True)
 
-    # 创建数据库表
+    # 配置日志
+    from yourapplication.log import configure_logging
+    configure_logging(app)
+
+    # 建表不在启动路径上，由 flask init-db（或 run.py）显式执行
     with app.app_context():
-        db.create_all()
-        app.logger.info("数据库表已创建")
+        configure_sqlite(app)
 
     # 移除后台线程的启动
     # from yourapplication.utils import start_background_tasks
@@ -38,17 +75,23 @@ def create_app(config_class=Config):
 
     return app
 
-def configure_logging(app):
-    # 确保日志目录存在
-    os.makedirs(app.config['LOG_DIR'], exist_ok=True)
+# 创建缺失的数据表，已有的表不改动
+def init_db(app):
+    with app.app_context():
+        db.create_all()
+        app.logger.info("数据库表已创建")
+
+def configure_sqlite(app):
+    if not app.config['SQLITE_TUNING'] or db.engine.dialect.name != 'sqlite':
+        return
+    pragmas = app.config['SQLITE_PRAGMAS']
 
-    # 设置日志文件路径
-    log_file_path = app.config['LOG_FILE']
+    # 每个新连接建立时应用 PRAGMA
+    @event.listens_for(db.engine, 'connect')
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
 
-    # 配置基于文件大小的轮转日志
-    handler = RotatingFileHandler(log_file_path, maxBytes=5 * 1024 * 1024, backupCount=5)  # 5MB，保留5个备份
-    formatter = logging.Formatter('%(asctime)s %(levelname)s:%(message)s')
-    handler.setFormatter(formatter)
-    handler.setLevel(logging.INFO)
-    app.logger.addHandler(handler)
-    app.logger.setLevel(logging.INFO)
+    app.logger.info(f"已启用 SQLite 性能配置：{pragmas}")
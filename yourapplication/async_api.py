@@ -0,0 +1,220 @@
+# yourapplication/async_api.py
+#
+# 预约和取消的异步接口，基于 aiohttp.web，由 run_async.py 启动
+# 上游请求和重试等待都不占用线程，一个进程可以同时挂起大量上游调用；
+# 数据库读写仍使用 Flask-SQLAlchemy，放到线程池中执行
+
+import asyncio
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+from flask import Flask
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+
+from yourapplication.forms import ReservationForm
+from yourapplication.upstream import (
+    SAVE_YUYUE_PATH, TUIKUAN_PATH, YUYUE_PATH, cancel_form_data, extract_yyp_pass, is_accepted, is_token_rejected,
+    reservation_form_data
+)
+from yourapplication.utils import delete_order, save_reservation
+
+
+class AsyncUpstreamError(Exception):
+    pass
+
+
+FLASK_APP = web.AppKey('flask_app', Flask)
+
+
+# 异步的上游客户端，共享一个 aiohttp 连接池，调用统计记到同步客户端的统计里
+class AsyncUpstream:
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self.config = flask_app.config
+        self.base_url = self.config['UPSTREAM_BASE_URL'].rstrip('/')
+        self.session = None
+        self.pending_tokens = {}  # 场馆编号 -> 进行中的 yyp_pass 获取
+
+    async def start(self, app):
+        config = self.config
+        connector = aiohttp.TCPConnector(
+            limit=config['ASYNC_UPSTREAM_LIMIT'],
+            keepalive_timeout=config['FETCH_KEEPALIVE_TIMEOUT'],
+        )
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=config['UPSTREAM_CONNECT_TIMEOUT'],
+            sock_read=config['UPSTREAM_READ_TIMEOUT'],
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers=config['HEADERS'])
+
+    async def close(self, app):
+        if self.session is not None:
+            await self.session.close()
+
+    # 返回 (状态码, 响应文本)，网络错误抛出 AsyncUpstreamError
+    async def request(self, method, endpoint, path, **kwargs):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                status = response.status
+                return response.status, await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise AsyncUpstreamError(f"{endpoint} 请求出错：{e!r}") from e
+        finally:
+            self.app.extensions['upstream'].record(endpoint, status, time.perf_counter() - started)
+
+    # 获取 yyp_pass，失败时以指数退避重试，等待期间不阻塞事件循环
+    async def fetch_yyp_pass(self, venue_id, retries=5, delay=0.2):
+        for attempt in range(retries):
+            try:
+                status, content = await self.request('GET', 'yuyue', YUYUE_PATH, params={'id': venue_id})
+                yyp_pass = extract_yyp_pass(content) if status < 400 else None
+                if yyp_pass:
+                    self.app.extensions['yyp_pass_cache'].store(venue_id, yyp_pass)
+                    return yyp_pass
+                self.app.logger.warning(f"获取 yyp_pass 失败, 重试 {attempt + 1}/{retries}")
+            except AsyncUpstreamError as e:
+                self.app.logger.error(f"获取 yyp_pass 请求出错: {e}")
+            await asyncio.sleep(min(delay * 2 ** attempt, 2.0))
+        return None
+
+    # 返回 (yyp_pass, 是否来自缓存)，同一场馆的并发请求共用一次获取
+    async def get_yyp_pass(self, venue_id):
+        yyp_pass = self.app.extensions['yyp_pass_cache'].peek(venue_id)
+        if yyp_pass:
+            return yyp_pass, True
+        task = self.pending_tokens.get(venue_id)
+        if task is None:
+            task = self.pending_tokens[venue_id] = asyncio.ensure_future(self.fetch_yyp_pass(venue_id))
+            task.add_done_callback(lambda _: self.pending_tokens.pop(venue_id, None))
+        return await asyncio.shield(task), False
+
+    # 发送预约请求；上游提示 yyp_pass 失效时作废缓存，若它来自缓存则重新获取后再试一次，其他拒绝直接返回
+    async def reserve(self, venue_id, make_data):
+        yyp_pass, cached = await self.get_yyp_pass(venue_id)
+        while True:
+            if not yyp_pass:
+                raise AsyncUpstreamError("无法获取预约密钥")
+            status, content = await self.request('POST', 'saveYuyue', SAVE_YUYUE_PATH, data=make_data(yyp_pass))
+            if status >= 400:
+                raise AsyncUpstreamError(f"saveYuyue 返回 {status}")
+            json_data = json.loads(content)
+            if not is_token_rejected(json_data, self.app.config['YYP_PASS_INVALID_MARKERS']):
+                return json_data
+            self.app.extensions['yyp_pass_cache'].invalidate(venue_id, yyp_pass)
+            if not cached:
+                return json_data
+            self.app.logger.warning(f"缓存的 yyp_pass 被拒绝，重新获取：{content}")
+            yyp_pass, cached = await self.get_yyp_pass(venue_id)
+
+    async def cancel(self, yuyue_id):
+        status, content = await self.request('POST', 'tuikuan', TUIKUAN_PATH, data=cancel_form_data(yuyue_id))
+        if status >= 400:
+            raise AsyncUpstreamError(f"tuikuan 返回 {status}")
+        return json.loads(content)
+
+
+# 在线程池中带应用上下文执行数据库操作
+async def run_db(flask_app, func, *args):
+    def call():
+        with flask_app.app_context():
+            return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, call)
+
+
+async def reserve_handler(request):
+    flask_app = request.app[FLASK_APP]
+    upstream = request.app[UPSTREAM]
+    post = await request.post()
+
+    # 与网页表单使用同一套校验规则
+    with flask_app.test_request_context():
+        form = ReservationForm(formdata=MultiDict(post), meta={'csrf': False})
+        if not form.validate():
+            return web.json_response({'errors': form.errors}, status=400)
+        fake_pool = flask_app.extensions['fake_pool']
+        yuyue_name = (form.yuyue_name.data or '').strip() or fake_pool.name()
+        yuyue_hp = (form.yuyue_hp.data or '').strip() or fake_pool.phone_number()
+        yuyue_time = str(form.yuyue_time.data)
+        yuyue_riqi = form.yuyue_riqi.data.strftime('%Y-%m-%d')
+        yuyue_changguan = form.yuyue_changguan.data
+    config = flask_app.config
+    yuyue_openid = config['NAME_OPENID_MAP'].get(yuyue_name, config['DEFAULT_OPENID'])
+    venue = flask_app.extensions['venues'].name_of(yuyue_changguan)
+
+    def make_data(yyp_pass):
+        return reservation_form_data(yyp_pass, yuyue_riqi, yuyue_time, yuyue_name, yuyue_hp,
+                                     yuyue_changguan, yuyue_openid)
+
+    try:
+        json_data = await upstream.reserve(yuyue_changguan, make_data)
+        if not is_accepted(json_data):
+            msg = json_data.get('Msg', '预约失败。') if isinstance(json_data, dict) else '预约失败。'
+            flask_app.logger.error(f"预约失败：{msg}")
+            return web.json_response({'error': msg, 'server_response': json_data}, status=409)
+        yuyue_id = int(json_data['data']['yuyue_id'])
+    except AsyncUpstreamError as e:
+        flask_app.logger.error(f"发送预约请求时出错：{e}")
+        return web.json_response({'error': str(e)}, status=502)
+    except (ValueError, KeyError, TypeError) as e:
+        flask_app.logger.error(f"解析服务器响应时出错：{e}")
+        return web.json_response({'error': '预约失败，无法解析服务器响应'}, status=502)
+
+    try:
+        await run_db(flask_app, save_reservation, yuyue_id, venue, yuyue_name, yuyue_hp, yuyue_riqi, yuyue_time)
+    except SQLAlchemyError as e:
+        flask_app.logger.error(f"保存预约 {yuyue_id} 时出错：{e}")
+        return web.json_response({'error': '保存预约信息失败', 'yuyue_id': yuyue_id}, status=500)
+
+    return web.json_response({
+        'yuyue_id': yuyue_id,
+        'venue': venue,
+        'name': yuyue_name,
+        'phone': yuyue_hp,
+        'date': yuyue_riqi,
+        'time': yuyue_time,
+        'server_response': json_data,
+    })
+
+
+async def cancel_handler(request):
+    flask_app = request.app[FLASK_APP]
+    yuyue_id = int(request.match_info['yuyue_id'])
+    try:
+        json_data = await request.app[UPSTREAM].cancel(yuyue_id)
+    except AsyncUpstreamError as e:
+        flask_app.logger.error(f"发送取消请求时出错：{e}")
+        return web.json_response({'yuyue_id': yuyue_id, 'error': str(e)}, status=502)
+    except ValueError:
+        flask_app.logger.error(f"取消订单 {yuyue_id} 时解析响应失败。")
+        return web.json_response({'yuyue_id': yuyue_id, 'error': '无法解析服务器响应'}, status=502)
+
+    if not is_accepted(json_data):
+        msg = json_data.get('Msg', '取消订单失败。') if isinstance(json_data, dict) else '取消订单失败。'
+        flask_app.logger.error(f"取消订单 {yuyue_id} 失败：{msg}")
+        return web.json_response({'yuyue_id': yuyue_id, 'cancelled': False, 'error': msg}, status=409)
+
+    try:
+        deleted = await run_db(flask_app, delete_order, yuyue_id)
+    except SQLAlchemyError as e:
+        flask_app.logger.error(f"取消订单 {yuyue_id} 时数据库错误：{e}")
+        return web.json_response({'yuyue_id': yuyue_id, 'cancelled': True, 'error': '数据库错误'}, status=500)
+    return web.json_response({'yuyue_id': yuyue_id, 'cancelled': True, 'deleted': deleted})
+
+
+UPSTREAM = web.AppKey('upstream', AsyncUpstream)
+
+
+def create_async_app(flask_app):
+    app = web.Application()
+    app[FLASK_APP] = flask_app
+    app[UPSTREAM] = upstream = AsyncUpstream(flask_app)
+    app.on_startup.append(upstream.start)
+    app.on_cleanup.append(upstream.close)
+    app.router.add_post('/api/reserve', reserve_handler)
+    app.router.add_post(r'/api/cancel_order/{yuyue_id:\d+}', cancel_handler)
+    return app
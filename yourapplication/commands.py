@@ -0,0 +1,60 @@
+# yourapplication/commands.py
+
+import click
+
+
+def register_commands(app):
+    # 初始化：创建缺失的数据表，首次部署和升级后执行一次
+    @app.cli.command('init-db')
+    def init_db_command():
+        from yourapplication import init_db
+        init_db(app)
+        click.echo("数据库表已创建")
+
+    # 迁移：根据 orders 表回填 order_slots 时间段表
+    @app.cli.command('backfill-order-slots')
+    def backfill_order_slots():
+        from yourapplication.utils import rebuild_order_slots
+        total = rebuild_order_slots()
+        click.echo(f"已为 {total} 条订单回填时间段")
+
+    # 从页面归档重新解析指定范围的订单，不访问网络
+    @app.cli.command('replay-orders')
+    @click.argument('start_id', type=int)
+    @click.argument('end_id', type=int)
+    def replay_orders(start_id, end_id):
+        from yourapplication.utils import update_database_with_range
+        stats = update_database_with_range(start_id, end_id, mode='replay')
+        click.echo(f"重放 {len(stats.replayed_ids)} 个页面，审核通过 {stats.found} 条，写入 {stats.written} 条，"
+                   f"删除 {stats.deleted} 条，归档中缺失 {stats.archive_misses} 个，耗时 {stats.elapsed:.2f}s")
+
+    # 页面归档的索引丢失或损坏时，按分段文件重建
+    @app.cli.command('rebuild-page-index')
+    def rebuild_page_index():
+        from yourapplication.page_archive import get_page_archive
+        archive = get_page_archive()
+        if archive is None:
+            raise click.ClickException("未启用页面归档（PAGE_ARCHIVE_ENABLED）")
+        total = archive.rebuild_index()
+        click.echo(f"已重建页面归档索引，共 {total} 条记录")
+
+    # 迁移：从旧版本升级时补全缺失的表、列和索引，回填场馆编号、排序位置和日期序数，并重建 order_slots
+    # migrate-venue-keys 和 migrate-order-days 是早先拆开的两个步骤，保留为同一迁移的别名
+    def upgrade_db():
+        from yourapplication.utils import upgrade_schema
+        total = upgrade_schema()
+        click.echo(f"数据库已升级到当前结构，已为 {total} 条订单重建时间段")
+
+    app.cli.command('upgrade-db')(upgrade_db)
+    app.cli.command('migrate-venue-keys', hidden=True)(upgrade_db)
+    app.cli.command('migrate-order-days', hidden=True)(upgrade_db)
+
+    # 数据保留：把预约日期早于保留期限的订单和预约移到归档表，之后执行 ANALYZE，空闲页较多时执行 VACUUM
+    @app.cli.command('archive-orders')
+    @click.option('--days', type=int, default=None, help='保留最近多少天，默认为 RETENTION_DAYS')
+    @click.option('--batch-size', type=int, default=None, help='每个事务移动的行数，默认为 RETENTION_BATCH_SIZE')
+    def archive_orders(days, batch_size):
+        from yourapplication.utils import archive_past_orders
+        result = archive_past_orders(days, batch_size)
+        click.echo(f"已归档 {result['cutoff']} 之前的订单 {result['orders']} 条、预约 {result['reservations']} 条，"
+                   f"{'已执行 VACUUM，' if result['vacuumed'] else ''}耗时 {result['seconds']:.2f}s")
@@ -0,0 +1,75 @@
+# yourapplication/fake_pool.py
+
+import threading
+from collections import deque
+
+from flask import current_app
+
+
+# 预先生成的随机姓名和手机号，表单留空时直接取用，不在请求中调用 Faker
+# Faker 及其语言数据在第一次取用时才加载；剩余不足 refill_at 时在后台线程补充，取空时当场补充
+class FakeIdentityPool:
+    def __init__(self, size=256, refill_at=64, locale='zh_CN'):
+        self.size = size
+        self.refill_at = refill_at
+        self.locale = locale
+        self.names = deque()
+        self.phones = deque()
+        self.lock = threading.Lock()
+        self.refilling = False
+        self._faker = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(size=config['FAKE_POOL_SIZE'], refill_at=config['FAKE_POOL_REFILL_AT'],
+                   locale=config['FAKE_LOCALE'])
+
+    @property
+    def faker(self):
+        if self._faker is None:
+            from faker import Faker
+            self._faker = Faker(self.locale)
+        return self._faker
+
+    def name(self):
+        return self._take(self.names)
+
+    def phone_number(self):
+        return self._take(self.phones)
+
+    def _take(self, items):
+        try:
+            value = items.popleft()
+        except IndexError:
+            self.refill()
+            value = items.popleft()
+        if len(items) < self.refill_at:
+            self._refill_in_background()
+        return value
+
+    # 补足到 size 条；多个线程同时取空时只有一个在生成，其余等待锁后发现已补足
+    def refill(self):
+        with self.lock:
+            faker = self.faker
+            while len(self.names) < self.size:
+                self.names.append(faker.name())
+            while len(self.phones) < self.size:
+                self.phones.append(faker.phone_number())
+
+    def _refill_in_background(self):
+        with self.lock:
+            if self.refilling:
+                return
+            self.refilling = True
+
+        def run():
+            try:
+                self.refill()
+            finally:
+                self.refilling = False
+
+        threading.Thread(target=run, name='fake-pool-refill', daemon=True).start()
+
+
+def get_fake_pool():
+    return current_app.extensions['fake_pool']
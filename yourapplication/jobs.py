@@ -0,0 +1,147 @@
+# yourapplication/jobs.py
+
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from yourapplication.utils import RANGELESS_SYNC_MODES
+
+
+# 一次后台同步任务，stats 在扫描过程中实时更新，可随时查询进度
+class SyncJob:
+    def __init__(self, mode, start_id, end_id):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.start_id = start_id
+        self.end_id = end_id
+        self.status = 'queued'  # queued / running / done / failed
+        self.error = None
+        self.stats = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    # 只有同模式的任务才能代替新请求；full 会清空后重新抓取，也能代替范围内的 incremental，
+    # replay 不访问网络，不能代替任何联网的模式
+    def covers(self, mode, start_id, end_id):
+        if self.mode in RANGELESS_SYNC_MODES or mode in RANGELESS_SYNC_MODES:
+            return self.mode == mode
+        if self.mode != mode and not (self.mode == 'full' and mode == 'incremental'):
+            return False
+        return self.start_id <= start_id and end_id <= self.end_id
+
+    def overlaps(self, start_id, end_id):
+        return self.start_id <= end_id and start_id <= self.end_id
+
+    def as_dict(self):
+        stats = self.stats
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'start_id': self.start_id,
+            'end_id': self.end_id,
+            'status': self.status,
+            'error': self.error,
+            'scanned': stats.pages if stats else 0,
+            'found': stats.found if stats else 0,
+            'errors': len(stats.failed_ids) if stats else 0,
+            'stats': stats.as_dict() if stats else None,
+            'created_at': self.created_at.isoformat(timespec='seconds'),
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+        }
+
+
+# 进程内的后台同步队列，单个工作线程依次执行，避免多个扫描同时写 SQLite
+class SyncJobQueue:
+    def __init__(self, app, history=50, max_range=1000):
+        self.app = app
+        self.history = history  # 保留的已结束任务数量
+        self.max_range = max_range  # 合并后的范围上限，与单次提交的限制相同
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+        self.last_retention = None  # 上次执行数据保留任务的时间（time.monotonic()）
+
+    # 提交任务；与进行中的任务重叠时复用或合并，返回 (任务, 是否新建)
+    def submit(self, mode, start_id=None, end_id=None):
+        with self.lock:
+            for job in self.jobs.values():
+                if not job.active:
+                    continue
+                if job.covers(mode, start_id, end_id):
+                    return job, False
+                # 尚未开始的同模式任务直接扩大范围，合并后超过范围上限时另建任务
+                if job.status == 'queued' and job.mode == mode not in RANGELESS_SYNC_MODES and job.overlaps(start_id, end_id):
+                    merged_start, merged_end = min(job.start_id, start_id), max(job.end_id, end_id)
+                    if mode != 'replay' and merged_end - merged_start > self.max_range:
+                        continue
+                    job.start_id, job.end_id = merged_start, merged_end
+                    return job, False
+
+            job = SyncJob(mode, start_id, end_id)
+            self.jobs[job.id] = job
+            self._prune()
+            self._ensure_worker()
+        self.queue.put(job)
+        return job, True
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def recent(self, limit=10):
+        with self.lock:
+            jobs = sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+        return jobs[:limit]
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if not job.active]
+        finished.sort(key=lambda job: job.created_at)
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job.id]
+
+    # 工作线程在第一次提交时才启动，避免在 fork 出的多个进程中提前创建线程
+    def _ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._run, name='sync-jobs', daemon=True)
+            self.worker.start()
+
+    def _run(self):
+        from yourapplication.utils import ScanStats, update_database_with_range
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                job.stats = ScanStats()
+                job.status = 'running'
+                job.started_at = datetime.now()
+                start_id, end_id = job.start_id, job.end_id
+            with self.app.app_context():
+                try:
+                    update_database_with_range(start_id, end_id, mode=job.mode, stats=job.stats)
+                    job.status = 'done'
+                except Exception as e:
+                    job.status = 'failed'
+                    job.error = str(e)
+                    self.app.logger.error(f"后台同步任务 {job.id} 失败：{e}")
+                finally:
+                    job.finished_at = datetime.now()
+                self._maybe_archive()
+
+    # 数据保留任务和同步任务在同一个工作线程中执行，不会同时写库；距上次执行不足 RETENTION_INTERVAL 时跳过
+    def _maybe_archive(self):
+        from yourapplication.utils import archive_past_orders
+        interval = self.app.config['RETENTION_INTERVAL']
+        if interval is None or (self.last_retention is not None and time.monotonic() - self.last_retention < interval):
+            return
+        self.last_retention = time.monotonic()
+        try:
+            archive_past_orders()
+        except Exception as e:
+            self.app.logger.error(f"归档过期订单失败：{e}")
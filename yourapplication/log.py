@@ -0,0 +1,80 @@
+# yourapplication/log.py
+#
+# 日志经 QueueHandler 放入队列，由 QueueListener 的后台线程写文件，请求和抓取协程不再等待磁盘 IO
+
+import atexit
+import json
+import logging
+import queue
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask.logging import default_handler
+
+# LogRecord 自带的属性，其余属性视为通过 extra 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+# 每条日志输出为一行 JSON，extra 传入的字段原样写入
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(app):
+    global _listener
+    config = app.config
+
+    # 重复创建应用时（基准测试、命令行）先停掉上一次的监听线程
+    stop_logging()
+    # Flask 默认的控制台输出也改为经队列写出
+    for handler in list(app.logger.handlers):
+        if isinstance(handler, QueueHandler) or handler is default_handler:
+            app.logger.removeHandler(handler)
+
+    # 配置基于文件大小的轮转日志
+    file_handler = RotatingFileHandler(config['LOG_FILE'], maxBytes=5 * 1024 * 1024, backupCount=5, encoding='utf-8')  # 5MB，保留5个备份
+    if config['LOG_FORMAT'] == 'json':
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s:%(message)s'))
+    handlers = [file_handler]
+    if config['LOG_TO_STDERR']:
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+        handlers.append(stream_handler)
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    app.logger.addHandler(QueueHandler(log_queue))
+    app.logger.setLevel(config['LOG_LEVEL'])
+
+    # 按模块调整日志级别，如 {'yourapplication.utils': 'WARNING'}
+    for name, level in config['LOG_LEVELS'].items():
+        logging.getLogger(name).setLevel(level)
+
+
+# 停止监听线程并写出队列中剩余的日志，可重复调用
+@atexit.register
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
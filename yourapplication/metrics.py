@@ -0,0 +1,189 @@
+# yourapplication/metrics.py
+#
+# 进程内指标，以 Prometheus 文本格式从 /metrics 输出：路由耗时、上游调用、范围扫描和 SQL 查询耗时
+
+import bisect
+import threading
+import time
+
+from flask import current_app, g, request
+from sqlalchemy import event
+
+# 统计 SQL 耗时时区分的语句类型，其余归为 other
+STATEMENT_KINDS = frozenset({'select', 'insert', 'update', 'delete', 'pragma', 'create', 'drop', 'vacuum', 'analyze'})
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# 只增不减的计数器，按标签值分别累计
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames, lock):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = lock
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def lines(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}"
+
+
+# 直方图：每组标签各自记录落入各区间的次数、总和与总数
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames, lock, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = lock
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # 标签值 -> [各区间计数（不累计）, 总和, 总数]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def lines(self):
+        bucket_labels = self.labelnames + ('le',)
+        for key, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{format_labels(bucket_labels, key + (format_value(bound),))} {cumulative}"
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.metrics = []
+
+        self.http_requests = self.histogram(
+            'http_request_duration_seconds', '路由处理耗时（秒）', ('endpoint', 'method', 'status'))
+        self.upstream_requests = self.histogram(
+            'upstream_request_duration_seconds', '上游接口调用耗时（秒）', ('endpoint', 'status'))
+        self.db_queries = self.histogram(
+            'db_query_duration_seconds', 'SQL 语句执行耗时（秒）', ('statement',))
+        self.scans = self.histogram('scan_duration_seconds', '范围扫描总耗时（秒）', ('mode',))
+        self.scan_pages = self.counter('scan_pages_total', '扫描抓取的页面数', ('mode',))
+        self.scan_found = self.counter('scan_approved_orders_total', '扫描到的审核通过订单数', ('mode',))
+        self.scan_retries = self.counter('scan_retries_total', '扫描中的重试次数', ('mode',))
+        self.scan_failed = self.counter('scan_failed_total', '重试耗尽仍未取到页面的 ID 数', ('mode',))
+        self.scan_written = self.counter('scan_written_rows_total', '扫描后写入（新增或变更）的订单行数', ('mode',))
+        self.scan_parse_seconds = self.counter('scan_parse_seconds_total', '扫描中解析页面的总耗时（秒）', ('mode',))
+        self.scan_write_seconds = self.counter('scan_db_write_seconds_total', '扫描中写库的总耗时（秒）', ('mode',))
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames, self.lock)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=()):
+        metric = Histogram(name, help_text, labelnames, self.lock, self.buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def observe_scan(self, mode, stats):
+        self.scans.observe(stats.elapsed, mode=mode)
+        self.scan_pages.inc(stats.pages, mode=mode)
+        self.scan_found.inc(stats.found, mode=mode)
+        self.scan_retries.inc(stats.retries, mode=mode)
+        self.scan_failed.inc(len(stats.failed_ids), mode=mode)
+        self.scan_written.inc(stats.written, mode=mode)
+        self.scan_parse_seconds.inc(stats.parse_seconds, mode=mode)
+        self.scan_write_seconds.inc(stats.write_seconds, mode=mode)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.lines())
+        return '\n'.join(lines) + '\n'
+
+
+def get_metrics():
+    return current_app.extensions.get('metrics')
+
+
+def statement_kind(statement):
+    words = statement.lstrip().split(None, 1)
+    kind = words[0].lower() if words else ''
+    return kind if kind in STATEMENT_KINDS else 'other'
+
+
+# 通过 SQLAlchemy 事件记录每条 SQL 的执行耗时；同一连接上的语句不会嵌套，用栈保存开始时间即可
+def instrument_engine(engine, metrics):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        metrics.db_queries.observe(time.perf_counter() - started, statement=statement_kind(statement))
+
+    # 执行出错时不会触发 after_cursor_execute，丢弃对应的开始时间
+    @event.listens_for(engine, 'handle_error')
+    def drop_query_timer(context):
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def init_metrics(app):
+    if not app.config['METRICS_ENABLED']:
+        app.extensions['metrics'] = None
+        return
+    metrics = app.extensions['metrics'] = MetricsRegistry(app.config['METRICS_BUCKETS'])
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        # 只统计蓝图中的路由，静态文件和 404 不计入
+        if started is not None and request.endpoint and request.endpoint != 'static':
+            metrics.http_requests.observe(time.perf_counter() - started, endpoint=request.endpoint,
+                                          method=request.method, status=response.status_code)
+        return response
+
+    from yourapplication.models import db
+    with app.app_context():
+        instrument_engine(db.engine, metrics)
@@ -6,15 +6,43 @@ class Order(db.Model):
     __tablename__ = 'orders'
     id = db.Column(db.Integer, primary_key=True)
     yuyue_id = db.Column(db.Integer, unique=True, nullable=False, index=True)
-    venue = db.Column(db.String(100), index=True)
+    venue = db.Column(db.String(100))  # 上游页面中的场馆名称，仅用于显示
+    venue_id = db.Column(db.Integer, index=True)  # 场馆目录中的编号，目录之外的场馆为空
+    venue_rank = db.Column(db.Integer)  # 场馆目录中的排序位置
     name = db.Column(db.String(50))
     phone = db.Column(db.String(20))
-    date = db.Column(db.String(20), index=True)
+    date = db.Column(db.String(20))  # 上游页面中的日期文字，仅用于显示
+    day = db.Column(db.Integer)  # 日期的序数（date.toordinal()），日期无法解析时为空，筛选和归档都按它进行
     time = db.Column(db.String(20), index=True)
+    slots = db.relationship('OrderSlot', backref='order', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_orders_day_venue_rank', 'day', 'venue_rank'),
+    )
 
     def __repr__(self):
         return f"<Order {self.yuyue_id}>"
 
+# 订单的单个时间段，入库时由 Order.time 按 ';' 拆分而来，供 /orders 直接按索引筛选排序
+class OrderSlot(db.Model):
+    __tablename__ = 'order_slots'
+    id = db.Column(db.Integer, primary_key=True)
+    yuyue_id = db.Column(db.Integer, db.ForeignKey('orders.yuyue_id'), nullable=False, index=True)
+    date = db.Column(db.String(20))
+    day = db.Column(db.Integer)
+    venue_id = db.Column(db.Integer)
+    venue_rank = db.Column(db.Integer, nullable=False)
+    start_hour = db.Column(db.Integer)
+    time = db.Column(db.String(20))
+
+    # 日期筛选用整数序数，场馆筛选和排序都使用整数的排序位置
+    __table_args__ = (
+        db.Index('ix_order_slots_day_rank_hour', 'day', 'venue_rank', 'start_hour'),
+    )
+
+    def __repr__(self):
+        return f"<OrderSlot {self.yuyue_id} {self.time}>"
+
 class Reservation(db.Model):
     __tablename__ = 'reservations'
     id = db.Column(db.Integer, primary_key=True)
@@ -22,8 +50,93 @@ class Reservation(db.Model):
     venue = db.Column(db.String(100), index=True)
     name = db.Column(db.String(50))
     phone = db.Column(db.String(20))
-    date = db.Column(db.String(20), index=True)
+    date = db.Column(db.String(20))
+    day = db.Column(db.Integer)
     time = db.Column(db.String(20), index=True)
 
+    __table_args__ = (
+        db.Index('ix_reservations_day_venue', 'day', 'venue'),
+    )
+
     def __repr__(self):
         return f"<Reservation {self.yuyue_id}>"
+
+# 预约日期早于保留期限的订单和预约由归档任务移到以下两张表，热表只保留近期数据
+# 归档表不建二级索引，只供事后查询
+class ArchivedOrder(db.Model):
+    __tablename__ = 'orders_archive'
+    yuyue_id = db.Column(db.Integer, primary_key=True)
+    venue = db.Column(db.String(100))
+    venue_id = db.Column(db.Integer)
+    name = db.Column(db.String(50))
+    phone = db.Column(db.String(20))
+    date = db.Column(db.String(20))
+    day = db.Column(db.Integer)
+    time = db.Column(db.String(20))
+    archived_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<ArchivedOrder {self.yuyue_id}>"
+
+class ArchivedReservation(db.Model):
+    __tablename__ = 'reservations_archive'
+    id = db.Column(db.Integer, primary_key=True)  # 与 reservations 表中的 id 相同
+    yuyue_id = db.Column(db.Integer)
+    venue = db.Column(db.String(100))
+    name = db.Column(db.String(50))
+    phone = db.Column(db.String(20))
+    date = db.Column(db.String(20))
+    day = db.Column(db.Integer)
+    time = db.Column(db.String(20))
+    archived_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<ArchivedReservation {self.id}>"
+
+# 同步状态的记录键
+SYNC_STATE_KEY = 'orders'
+
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'
+    key = db.Column(db.String(50), primary_key=True)
+    high_water_mark = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<SyncState {self.key}={self.high_water_mark}>"
+
+class TerminalOrder(db.Model):
+    __tablename__ = 'terminal_orders'
+    yuyue_id = db.Column(db.Integer, primary_key=True)
+    reason = db.Column(db.String(20))  # cancelled / past_date
+    recorded_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<TerminalOrder {self.yuyue_id} {self.reason}>"
+
+# 订单数据版本的记录键
+ORDERS_DATA_VERSION = 'orders'
+
+# 数据版本号，每次写入订单后加一，用于 ETag 和缓存失效
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<DataVersion {self.name}={self.version}>"
+
+# 每个 yuyue_id 最近一次抓取到的页面指纹和解析结果，内容未变化时跳过解析和写库
+class PageState(db.Model):
+    __tablename__ = 'page_states'
+    yuyue_id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(32))
+    etag = db.Column(db.String(200))
+    last_modified = db.Column(db.String(64))
+    status = db.Column(db.String(20))  # approved / terminal / other
+    order_json = db.Column(db.Text)  # 审核通过时的订单字段
+    fetched_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<PageState {self.yuyue_id} {self.status}>"
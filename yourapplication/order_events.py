@@ -0,0 +1,103 @@
+# yourapplication/order_events.py
+#
+# 订单变更的进程内发布/订阅，/orders/stream 以 Server-Sent Events 推送给打开的订单页面
+# 写库的函数在提交后发布一条事件：新增或变更的订单（完整字段）和删除的 yuyue_id
+# 只在本进程内传递；多进程部署时，其他进程中的后台同步任务写入的变更不会推送
+
+import itertools
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from flask import current_app
+
+
+@dataclass(frozen=True, slots=True)
+class OrderEvent:
+    seq: int
+    kind: str  # orders：按行打补丁；reset：变更太多或无法补齐，页面需要整体刷新
+    upserted: tuple = ()  # 新增或变更的订单字典
+    removed: tuple = ()  # 删除的 yuyue_id
+
+
+# 一个打开的订单页面；队列满了说明客户端跟不上，标记后由推送方发 reset 并断开
+@dataclass(eq=False)
+class Subscriber:
+    events: queue.Queue
+    overflowed: bool = False
+
+
+class OrderEventBroker:
+    def __init__(self, buffer_size=256, queue_size=100, max_subscribers=50):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.recent = deque(maxlen=buffer_size)  # 最近的事件，断线重连时按 Last-Event-ID 补发
+        self.subscribers = set()
+        self.seq = itertools.count(1)
+        self.last_seq = 0
+        self.lock = threading.Lock()
+        self.published = 0
+        self.overflows = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            buffer_size=config['ORDER_EVENTS_BUFFER'],
+            queue_size=config['ORDER_EVENTS_QUEUE_SIZE'],
+            max_subscribers=config['ORDER_EVENTS_MAX_SUBSCRIBERS'],
+        )
+
+    def publish(self, upserted=(), removed=(), reset=False):
+        if not (upserted or removed or reset):
+            return None
+        with self.lock:
+            event = OrderEvent(next(self.seq), 'reset' if reset else 'orders', tuple(upserted), tuple(removed))
+            self.last_seq = event.seq
+            self.recent.append(event)
+            self.published += 1
+            for subscriber in self.subscribers:
+                self._deliver(subscriber, event)
+        return event
+
+    def _deliver(self, subscriber, event):
+        if subscriber.overflowed:
+            return
+        try:
+            subscriber.events.put_nowait(event)
+        except queue.Full:
+            subscriber.overflowed = True
+            self.overflows += 1
+
+    # 订阅 since 之后的事件；since 之后的事件已不在缓冲区中，或 since 来自重启之前的进程（大于当前序号）时，
+    # 先放入一条 reset；订阅者数量达到上限时返回 None
+    def subscribe(self, since=None):
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                return None
+            subscriber = Subscriber(queue.Queue(maxsize=self.queue_size))
+            if since is not None and since != self.last_seq:
+                missed = [event for event in self.recent if event.seq > since]
+                if not missed or missed[0].seq != since + 1:
+                    missed = [OrderEvent(self.last_seq, 'reset')]
+                for event in missed:
+                    self._deliver(subscriber, event)
+            self.subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def stats_snapshot(self):
+        with self.lock:
+            return {
+                'subscribers': len(self.subscribers),
+                'last_seq': self.last_seq,
+                'published': self.published,
+                'overflows': self.overflows,
+            }
+
+
+def get_order_events():
+    return current_app.extensions.get('order_events')
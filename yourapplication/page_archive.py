@@ -0,0 +1,247 @@
+# yourapplication/page_archive.py
+#
+# yuyueIn 原始页面的归档：只追加的压缩分段文件，加一个定长条目的索引文件
+# 每个页面单独压缩，按索引定位后只读取并解压这一条；同一 yuyue_id 的多次抓取都会保留
+# 只支持单个写入进程（后台同步任务在同一进程内串行执行）
+
+import glob
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+from flask import current_app
+
+# 分段文件中每条记录的头部：yuyue_id、抓取时间（Unix 时间戳）、压缩后长度；索引丢失时据此重建
+RECORD_HEADER = struct.Struct('<IdI')
+# 索引中的一条：yuyue_id、抓取时间、分段编号、数据在分段中的偏移、压缩后长度，共 26 字节
+INDEX_ENTRY = struct.Struct('<IdHQI')
+
+INDEX_FILE = 'index.bin'
+SEGMENT_FILE = 'segment-{:06d}.bin'
+SEGMENT_RE = re.compile(r'segment-(\d{6})\.bin$')
+
+# 累积多少条未写入索引的记录后落盘一次
+FLUSH_EVERY = 500
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveEntry:
+    fetched_at: float
+    segment: int
+    offset: int
+    length: int
+
+
+class PageArchive:
+    def __init__(self, path, segment_size=64 * 1024 * 1024, compress_level=6):
+        self.path = path
+        self.segment_size = segment_size  # 分段文件超过该大小后换新文件
+        self.compress_level = compress_level
+        self.entries = {}  # yuyue_id -> [ArchiveEntry, ...]，按写入顺序
+        self.index_loaded = 0  # 已读入内存的索引字节数
+        self.pending = []  # 已写入分段、尚未写入索引的条目
+        self.segment = None
+        self.segment_no = None
+        self.segment_offset = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config['PAGE_ARCHIVE_DIR'],
+            segment_size=config['PAGE_ARCHIVE_SEGMENT_SIZE'],
+            compress_level=config['PAGE_ARCHIVE_COMPRESS_LEVEL'],
+        )
+
+    @property
+    def index_path(self):
+        return os.path.join(self.path, INDEX_FILE)
+
+    def segment_path(self, segment_no):
+        return os.path.join(self.path, SEGMENT_FILE.format(segment_no))
+
+    def segment_numbers(self):
+        numbers = []
+        for path in glob.glob(os.path.join(self.path, 'segment-*.bin')):
+            match = SEGMENT_RE.search(path)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    # 读入索引文件中新增的条目；末尾不完整的条目（写入中断）忽略
+    def _load_index(self):
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            return
+        size -= size % INDEX_ENTRY.size
+        if size <= self.index_loaded:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self.index_loaded)
+            data = f.read(size - self.index_loaded)
+        for yuyue_id, fetched_at, segment, offset, length in INDEX_ENTRY.iter_unpack(data):
+            self.entries.setdefault(yuyue_id, []).append(ArchiveEntry(fetched_at, segment, offset, length))
+        self.index_loaded = size
+
+    def _open_segment(self, record_size):
+        if self.segment is None:
+            os.makedirs(self.path, exist_ok=True)
+            numbers = self.segment_numbers()
+            self.segment_no = numbers[-1] if numbers else 1
+            self.segment = open(self.segment_path(self.segment_no), 'ab')
+            self.segment_offset = self.segment.tell()
+        if self.segment_offset and self.segment_offset + record_size > self.segment_size:
+            self.segment.close()
+            self.segment_no += 1
+            self.segment = open(self.segment_path(self.segment_no), 'ab')
+            self.segment_offset = 0
+        return self.segment
+
+    def append(self, yuyue_id, content, fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        data = zlib.compress(content.encode('utf-8'), self.compress_level)
+        with self.lock:
+            segment = self._open_segment(RECORD_HEADER.size + len(data))
+            segment.write(RECORD_HEADER.pack(yuyue_id, fetched_at, len(data)))
+            segment.write(data)
+            offset = self.segment_offset + RECORD_HEADER.size
+            self.segment_offset = offset + len(data)
+            self.pending.append(INDEX_ENTRY.pack(yuyue_id, fetched_at, self.segment_no, offset, len(data)))
+            if len(self.pending) >= FLUSH_EVERY:
+                self._flush()
+
+    # 先落盘分段数据，再追加索引，保证索引指向的数据都已写入
+    def _flush(self):
+        if not self.pending:
+            return
+        self.segment.flush()
+        with open(self.index_path, 'ab') as f:
+            # 截掉上次中断留下的半条索引
+            f.truncate(f.tell() - f.tell() % INDEX_ENTRY.size)
+            f.write(b''.join(self.pending))
+        self.pending = []
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            if self.segment is not None:
+                self.segment.close()
+                self.segment = None
+
+    # 返回 yuyue_id 在 at（Unix 时间戳）时或之前最近一次抓取的条目，at 为 None 时取最新一次
+    def lookup(self, yuyue_id, at=None):
+        with self.lock:
+            self._load_index()
+            return self._select(self.entries.get(yuyue_id), at)
+
+    @staticmethod
+    def _select(versions, at):
+        if not versions:
+            return None
+        if at is None:
+            return versions[-1]
+        earlier = [entry for entry in versions if entry.fetched_at <= at]
+        return max(earlier, key=lambda entry: entry.fetched_at) if earlier else None
+
+    # 归档中出现过的全部 yuyue_id
+    def ids(self):
+        with self.lock:
+            self._load_index()
+            return sorted(self.entries)
+
+    def versions(self, yuyue_id):
+        with self.lock:
+            self._load_index()
+            return list(self.entries.get(yuyue_id, ()))
+
+    @staticmethod
+    def _read(f, entry):
+        f.seek(entry.offset)
+        return zlib.decompress(f.read(entry.length)).decode('utf-8')
+
+    # 读取单个页面，返回 (抓取时间, 页面内容)，没有归档时返回 None
+    def get(self, yuyue_id, at=None):
+        entry = self.lookup(yuyue_id, at)
+        if entry is None:
+            return None
+        with open(self.segment_path(entry.segment), 'rb') as f:
+            return entry.fetched_at, self._read(f, entry)
+
+    # 批量读取一组 ID 的页面，按分段和偏移排序后顺序读盘，产出 (yuyue_id, 抓取时间, 页面内容)
+    def iter_pages(self, ids, at=None):
+        located = []
+        with self.lock:
+            self._load_index()
+            for yuyue_id in ids:
+                entry = self._select(self.entries.get(yuyue_id), at)
+                if entry is not None:
+                    located.append((entry.segment, entry.offset, yuyue_id, entry))
+        located.sort()
+        handle = None
+        current = None
+        try:
+            for segment, _, yuyue_id, entry in located:
+                if segment != current:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(self.segment_path(segment), 'rb')
+                    current = segment
+                yield yuyue_id, entry.fetched_at, self._read(handle, entry)
+        finally:
+            if handle is not None:
+                handle.close()
+
+    # 索引丢失或损坏时，按分段文件中的记录头重建索引，返回记录数
+    def rebuild_index(self):
+        with self.lock:
+            if self.segment is not None:
+                self.segment.flush()
+            self.pending = []
+            os.makedirs(self.path, exist_ok=True)
+            entries = []
+            for segment_no in self.segment_numbers():
+                with open(self.segment_path(segment_no), 'rb') as f:
+                    offset = 0
+                    while True:
+                        header = f.read(RECORD_HEADER.size)
+                        if len(header) < RECORD_HEADER.size:
+                            break
+                        yuyue_id, fetched_at, length = RECORD_HEADER.unpack(header)
+                        offset += RECORD_HEADER.size
+                        if len(f.read(length)) < length:
+                            break
+                        entries.append(INDEX_ENTRY.pack(yuyue_id, fetched_at, segment_no, offset, length))
+                        offset += length
+            with open(self.index_path, 'wb') as f:
+                f.write(b''.join(entries))
+            self.entries = {}
+            self.index_loaded = 0
+            self._load_index()
+            return len(entries)
+
+    def stats_snapshot(self):
+        with self.lock:
+            self._load_index()
+            versions = sum(len(entries) for entries in self.entries.values())
+            pages = len(self.entries)
+        segments = self.segment_numbers()
+        return {
+            'pages': pages,
+            'versions': versions,
+            'segments': len(segments),
+            'segment_bytes': sum(os.path.getsize(self.segment_path(number)) for number in segments),
+            'index_bytes': self.index_loaded,
+        }
+
+
+def get_page_archive():
+    return current_app.extensions.get('page_archive')
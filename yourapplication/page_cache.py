@@ -0,0 +1,98 @@
+# yourapplication/page_cache.py
+
+import hashlib
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from yourapplication.models import db, Order, PageState
+
+PAGE_STATE_COLUMNS = ('yuyue_id', 'content_hash', 'etag', 'last_modified', 'status', 'order_json', 'fetched_at')
+
+
+def content_hash(content):
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# 一次扫描用到的页面指纹：扫描开始时一次性读出，抓取过程中只读内存
+class PageCache:
+    def __init__(self, states):
+        self.states = states  # yuyue_id -> page_states 的行
+
+    # 按上次的 ETag / Last-Modified 构造条件请求头
+    def conditional_headers(self, yuyue_id):
+        state = self.states.get(yuyue_id)
+        headers = {}
+        if state is not None:
+            if state.etag:
+                headers['If-None-Match'] = state.etag
+            if state.last_modified:
+                headers['If-Modified-Since'] = state.last_modified
+        return headers
+
+    # 页面未变化时返回上次的记录，否则返回 None；content_hash 为 None 表示上游返回了 304
+    def unchanged(self, yuyue_id, page_hash=None):
+        state = self.states.get(yuyue_id)
+        if state is None:
+            return None
+        if page_hash is None or state.content_hash == page_hash:
+            return state
+        return None
+
+    @staticmethod
+    def order_data(state):
+        return json.loads(state.order_json) if state.order_json else None
+
+    @staticmethod
+    def make_state(yuyue_id, page_hash, headers, status, order_data):
+        return {
+            'yuyue_id': yuyue_id,
+            'content_hash': page_hash,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'status': status,
+            'order_json': json.dumps(order_data, ensure_ascii=False) if order_data else None,
+            'fetched_at': datetime.now(),
+        }
+
+
+# 读取一组 yuyue_id 的页面指纹；审核通过但本地已没有订单的记录不可信，直接忽略
+def load_page_cache(ids):
+    if not current_app.config['PAGE_CACHE_ENABLED']:
+        return None
+    ids = set(ids)
+    if not ids:
+        return PageCache({})
+    table = PageState.__table__
+    rows = db.session.execute(
+        db.select(table, Order.yuyue_id.is_not(None).label('has_order'))
+        .outerjoin(Order, Order.yuyue_id == table.c.yuyue_id)
+        .where(table.c.yuyue_id.between(min(ids), max(ids)))
+    ).all()
+    states = {
+        row.yuyue_id: row for row in rows
+        if row.yuyue_id in ids and (row.status != 'approved' or row.has_order)
+    }
+    return PageCache(states)
+
+
+# 保存抓取过程中记录的页面指纹
+def save_page_states(rows):
+    if not rows:
+        return
+    app = current_app
+    try:
+        table = PageState.__table__
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.yuyue_id],
+            set_={column: stmt.excluded[column] for column in PAGE_STATE_COLUMNS[1:]},
+        )
+        db.session.execute(stmt, rows)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        app.logger.error(f"保存页面指纹时数据库错误：{e}")
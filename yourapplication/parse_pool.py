@@ -0,0 +1,103 @@
+# yourapplication/parse_pool.py
+
+import asyncio
+import atexit
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from yourapplication.parsers import parse_pages
+
+# 解析执行方式：inline 在事件循环内直接解析；thread / process 交给线程池或进程池
+PARSE_EXECUTOR_MODES = ('inline', 'thread', 'process')
+
+# 每个进程按 (模式, 工作数) 缓存执行器，避免每次扫描重复启动进程池
+_executors = {}
+
+
+def get_parse_executor(mode, workers=None):
+    if mode not in PARSE_EXECUTOR_MODES:
+        raise ValueError(f"未知的解析执行方式：{mode}")
+    if mode == 'inline':
+        return None
+    key = (mode, workers)
+    executor = _executors.get(key)
+    if executor is None:
+        if mode == 'process':
+            # 使用 spawn，避免在多线程的 Web 进程中 fork
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='parse')
+        _executors[key] = executor
+    return executor
+
+
+# 执行器已损坏（工作进程退出）或已关闭时从缓存中移除，下次扫描重新创建
+def discard_parse_executor(executor):
+    for key, cached in list(_executors.items()):
+        if cached is executor:
+            del _executors[key]
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_parse_executors():
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
+
+
+# 把待解析的页面攒成批次后提交给执行器，每批一次 run_in_executor
+class ParseBatcher:
+    def __init__(self, executor, backend, batch_size=8, max_delay=0.005):
+        self.executor = executor
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_delay = max_delay  # 批次未满时最多等待的秒数
+        self.pending = []
+        self.flush_handle = None
+        self.batches = 0
+
+    async def parse(self, content):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((content, future))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        self.batches += 1
+        loop = asyncio.get_running_loop()
+        # 提交失败时（进程池已损坏、执行器已关闭等）这批页面直接以异常结束，否则等待它们的扫描会一直挂起
+        try:
+            task = loop.run_in_executor(self.executor, parse_pages, self.backend, [content for content, _ in batch])
+        except (BrokenExecutor, RuntimeError) as e:
+            discard_parse_executor(self.executor)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        task.add_done_callback(lambda done: self._resolve(batch, done))
+
+    def _resolve(self, batch, done):
+        cancelled = done.cancelled()
+        error = None if cancelled else done.exception()
+        if isinstance(error, BrokenExecutor):
+            discard_parse_executor(self.executor)
+        results = None if cancelled or error else done.result()
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if cancelled:
+                future.cancel()
+            elif error:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
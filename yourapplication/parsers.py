@@ -0,0 +1,160 @@
+# yourapplication/parsers.py
+
+import html
+import re
+
+# 审核通过页面的标志文字，不包含时无需解析
+APPROVED_MARKER = '审核通过，可以进场'
+
+# 预编译的正则表达式，匹配 yuyueIn 详情页中的字段
+VENUE_LABEL_RE = re.compile(r'<label(?:\s[^>]*)?>预约场馆</label>')
+NAME_LABEL_RE = re.compile(r'<label(?:\s[^>]*)?>预约姓名</label>')
+TIME_LABEL_RE = re.compile(r'<label(?:\s[^>]*)?>预约时间</label>')
+SIBLING_DIV_RE = re.compile(r'\s*<div(?:\s[^>]*)?>(.*?)</div>', re.S)
+PARENT_OPEN_RE = re.compile(r'<(\w+)(?:\s[^>]*)?>\s*$')
+SPAN_RE = re.compile(r'<span(?:\s[^>]*)?>(.*?)</span>', re.S)
+DATE_STYLE = 'font-weight:600;margin-right:1rem'
+DATE_SPAN_RE = re.compile(r'<span\s+style="' + re.escape(DATE_STYLE) + r'"\s*>(.*?)</span>', re.S)
+EM_RE = re.compile(r'<em(?:\s[^>]*)?>(.*?)</em>', re.S)
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+class ParseError(Exception):
+    pass
+
+
+# 去掉标签并解码实体，等价于 BeautifulSoup 的 .text
+def _text(fragment):
+    return html.unescape(TAG_RE.sub('', fragment))
+
+
+# 基于 BeautifulSoup 的解析，结构不符时抛出异常
+# bs4 只在回退解析时才用到，第一次调用时再导入
+def parse_order_bs4(content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # 找到预约场馆
+    venue_label = soup.find('label', string='预约场馆')
+    if not venue_label:
+        raise ParseError("无法找到预约场馆标签")
+    venue = venue_label.find_next_sibling('div').text.strip()
+
+    # 找到预约姓名和电话
+    name_hp_div = soup.find('label', string='预约姓名').find_next_sibling('div')
+    if not name_hp_div:
+        raise ParseError("无法找到预约姓名标签")
+    name = name_hp_div.contents[0].strip()
+    phone = name_hp_div.find('span').text.strip() if name_hp_div.find('span') else ''
+
+    # 找到预约时间
+    date_time_div = soup.find('label', string='预约时间').parent
+    date_span = date_time_div.find('span', style='font-weight:600;margin-right:1rem')
+    date = date_span.text.strip() if date_span else ''
+
+    time_em = date_time_div.find('em')
+    time_info = time_em.text.strip() if time_em else ''
+
+    return {'venue': venue, 'name': name, 'phone': phone, 'date': date, 'time': time_info}
+
+
+# 找到 start 处已打开的 tag 元素的结束位置，嵌套不平衡时返回 -1
+def _element_end(content, start, tag):
+    tag_re = re.compile(rf'<(/?){tag}(?:\s[^>]*)?>')
+    depth = 1
+    for match in tag_re.finditer(content, start):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.start()
+    return -1
+
+
+# 标签后紧跟的 div 内容，对应 find_next_sibling('div')
+def _sibling_div(content, label):
+    match = SIBLING_DIV_RE.match(content, label.end())
+    if not match or '<div' in match.group(1):
+        return None
+    return match.group(1)
+
+
+# 基于预编译正则的快速解析，不构建文档树
+# 页面结构与预期不一致时返回 None，由调用方回退到 BeautifulSoup
+def parse_order_regex(content):
+    if '<!--' in content:
+        return None
+    venue_label = VENUE_LABEL_RE.search(content)
+    name_label = NAME_LABEL_RE.search(content)
+    time_label = TIME_LABEL_RE.search(content)
+    if not venue_label or not name_label or not time_label:
+        return None
+
+    venue_html = _sibling_div(content, venue_label)
+    name_html = _sibling_div(content, name_label)
+    if venue_html is None or name_html is None:
+        return None
+
+    # 姓名是 div 的第一个文本节点，若 div 以标签开头则交给 BeautifulSoup 判断
+    first_tag = name_html.find('<')
+    name_text = name_html if first_tag == -1 else name_html[:first_tag]
+    if not name_text:
+        return None
+    span_match = SPAN_RE.search(name_html)
+    if span_match and '<span' in span_match.group(1):
+        return None
+
+    # 预约时间字段在标签的父元素内查找，父元素须紧挨在标签之前打开
+    parent_open = PARENT_OPEN_RE.search(content, 0, time_label.start())
+    if not parent_open:
+        return None
+    parent_end = _element_end(content, parent_open.end(), parent_open.group(1))
+    if parent_end == -1:
+        return None
+    time_html = content[time_label.end():parent_end]
+    date_match = DATE_SPAN_RE.search(time_html)
+    if not date_match and DATE_STYLE in time_html:
+        return None
+    em_match = EM_RE.search(time_html)
+
+    return {
+        'venue': _text(venue_html).strip(),
+        'name': html.unescape(name_text).strip(),
+        'phone': _text(span_match.group(1)).strip() if span_match else '',
+        'date': _text(date_match.group(1)).strip() if date_match else '',
+        'time': _text(em_match.group(1)).strip() if em_match else '',
+    }
+
+
+# 先尝试正则解析，无法确定时回退到 BeautifulSoup
+def parse_order_fast(content):
+    order_fields = parse_order_regex(content)
+    if order_fields is None:
+        order_fields = parse_order_bs4(content)
+    return order_fields
+
+
+PARSER_BACKENDS = {
+    'regex': parse_order_fast,
+    'bs4': parse_order_bs4,
+}
+
+
+def get_parser(name):
+    try:
+        return PARSER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"未知的解析器：{name}")
+
+
+# 解析一页并返回 (字段, 错误信息)，可在工作进程中调用，结果可直接 pickle 回传
+def parse_page(backend, content):
+    try:
+        return get_parser(backend)(content), None
+    except ParseError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"提取订单时出错：{e}"
+
+
+# 批量解析，减少进程池每页的序列化和调度开销
+def parse_pages(backend, contents):
+    return [parse_page(backend, content) for content in contents]
@@ -0,0 +1,151 @@
+# yourapplication/retry.py
+#
+# 抓取上游页面时的重试、限速和熔断组件，均在单个事件循环内使用
+
+import asyncio
+import random
+import time
+from collections import deque
+
+
+# 重试策略：只重试可重试的状态码和网络错误，退避时间按指数增长并加全抖动
+class RetryPolicy:
+    def __init__(self, max_attempts=5, base_delay=0.5, max_delay=30, retry_statuses=(429, 500, 502, 503, 504)):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+
+    # aiohttp 只在抓取时才用到，第一次访问时再导入
+    @property
+    def retryable_errors(self):
+        import aiohttp
+        return (aiohttp.ClientError, asyncio.TimeoutError)
+
+    def should_retry_status(self, status):
+        return status in self.retry_statuses
+
+    # 第 attempt 次（从 0 开始）失败后的等待时间；上游给出 Retry-After 时不早于它
+    def backoff(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    @staticmethod
+    def retry_after(headers):
+        try:
+            return float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+
+# 令牌桶限速：所有抓取协程共用，平均每秒不超过 rate 个请求，允许 burst 个突发
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate  # 为 None 或 0 时不限速
+        self.capacity = burst or rate or 1
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    # 取得一个令牌，返回等待的秒数
+    async def acquire(self):
+        if not self.rate:
+            return 0.0
+        started = time.monotonic()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - started
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# 熔断器：最近 window 次请求中失败比例超过 failure_rate 时打开，暂停所有请求 cooldown 秒；
+# 之后放行一个探测请求，成功则恢复，失败则继续暂停
+class CircuitBreaker:
+    def __init__(self, window=50, failure_rate=0.5, min_calls=20, cooldown=30, logger=None):
+        self.results = deque(maxlen=window)
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.logger = logger
+        self.state = 'closed'  # closed / open / half_open
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0  # 打开的次数
+        self.paused_seconds = 0.0  # 处于打开或探测状态的总时长
+
+    # 请求前调用，熔断期间在此等待；返回本次请求是否为探测请求
+    async def before_call(self):
+        while self.state != 'closed':
+            if self.state == 'open':
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+                self.state = 'half_open'
+            if not self.probing:
+                self.probing = True
+                return True
+            await asyncio.sleep(min(1.0, self.cooldown))
+        return False
+
+    def record(self, success, probe=False):
+        if probe:
+            self.probing = False
+            if success:
+                self.paused_seconds += time.monotonic() - self.opened_at
+                self.state = 'closed'
+                self.results.clear()
+                if self.logger:
+                    self.logger.info("上游已恢复，熔断器关闭")
+            else:
+                self._open()
+            return
+        self.results.append(success)
+        if self.state == 'closed' and len(self.results) >= self.min_calls:
+            failures = self.results.count(False)
+            if failures / len(self.results) >= self.failure_rate:
+                self.trips += 1
+                self._open()
+                if self.logger:
+                    self.logger.warning(f"上游错误率 {failures}/{len(self.results)}，熔断 {self.cooldown} 秒")
+
+    def _open(self):
+        now = time.monotonic()
+        if self.state != 'closed':
+            self.paused_seconds += now - self.opened_at
+        self.state = 'open'
+        self.opened_at = now
+
+
+# 一次扫描共用的重试策略、限速器和熔断器
+class FetchControls:
+    def __init__(self, policy, limiter, breaker):
+        self.policy = policy
+        self.limiter = limiter
+        self.breaker = breaker
+
+    @classmethod
+    def from_config(cls, config, logger=None):
+        return cls(
+            RetryPolicy(
+                max_attempts=config['FETCH_MAX_ATTEMPTS'],
+                base_delay=config['FETCH_BACKOFF_BASE'],
+                max_delay=config['FETCH_BACKOFF_MAX'],
+                retry_statuses=config['FETCH_RETRY_STATUSES'],
+            ),
+            TokenBucket(config['FETCH_RATE_LIMIT'], config['FETCH_RATE_BURST']),
+            CircuitBreaker(
+                window=config['BREAKER_WINDOW'],
+                failure_rate=config['BREAKER_FAILURE_RATE'],
+                min_calls=config['BREAKER_MIN_CALLS'],
+                cooldown=config['BREAKER_COOLDOWN'],
+                logger=logger,
+            ),
+        )
@@ -0,0 +1,276 @@
+# yourapplication/upstream.py
+
+import re
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+# 上游接口路径
+YUYUE_PATH = '/wap/yuyue'
+SAVE_YUYUE_PATH = '/inc/ajax/save/saveYuyue'
+TUIKUAN_PATH = '/inc/ajax/save/tuikuan'
+
+# 预约页面中的 yyp_pass，兼容隐藏表单字段和脚本变量两种写法
+YYP_PASS_RE = re.compile(r"""yyp_pass["']?\s*(?:[:=]|value=)\s*["']([^"']+)["']""")
+
+
+# 从预约页面提取 yyp_pass
+def extract_yyp_pass(content):
+    match = YYP_PASS_RE.search(content)
+    return match.group(1) if match else None
+
+
+# saveYuyue 的表单数据
+def reservation_form_data(yyp_pass, yuyue_riqi, yuyue_time, yuyue_name, yuyue_hp, yuyue_changguan, yuyue_openid):
+    return {
+        'isWeb': 1,
+        'API': 'saveYuyue',
+        'noSave': 'yuyue_id',
+        'back': 'yuyue_id',
+        'yyp_pass': yyp_pass,
+        'yuyue_riqi': yuyue_riqi,
+        'yuyue_time': yuyue_time,
+        'yuyue_name': yuyue_name,
+        'yuyue_hp': yuyue_hp,
+        'yuyue_view': -1,
+        'yuyue_changguan': yuyue_changguan,
+        'yuyue_openid': yuyue_openid,
+        'yuyue_chengren': 1
+    }
+
+
+# tuikuan 的表单数据
+def cancel_form_data(yuyue_id):
+    return {
+        'isWeb': 1,
+        'tuikuan_id': yuyue_id,  # 退款ID，即 yuyue_id
+        'API': 'tuikuan',
+        'tuikuanflag': 'yuyue'
+    }
+
+
+# 上游明确返回 Code 为 0 才算请求成功；缺少 Code 或响应不是对象时都按失败处理
+def is_accepted(json_data):
+    return isinstance(json_data, dict) and str(json_data.get('Code')) == '0'
+
+
+# 预约被拒绝的原因是 yyp_pass 失效：提示信息中含 markers 中的任一文字
+def is_token_rejected(json_data, markers):
+    if is_accepted(json_data) or not isinstance(json_data, dict):
+        return False
+    msg = str(json_data.get('Msg') or '')
+    return any(marker in msg for marker in markers)
+
+
+# 上游请求失败（网络错误或 HTTP 4xx/5xx），调用方无需依赖 requests 的异常类型
+class UpstreamError(Exception):
+    pass
+
+
+# 单个上游接口的调用统计
+class EndpointStats:
+    def __init__(self, window):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.latencies = deque(maxlen=window)  # 最近若干次调用的耗时（秒）
+        self.statuses = {}
+
+    def as_dict(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_ms': round(self.total_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            'p50_ms': round(percentile(50) * 1000, 2),
+            'p99_ms': round(percentile(99) * 1000, 2),
+            'statuses': dict(self.statuses),
+        }
+
+
+# 应用级的上游 HTTP 客户端：共享一个带连接池的 requests.Session，
+# 复用 keep-alive 连接，统一超时，并按接口记录调用耗时
+# requests 在第一次请求时才导入并创建会话，不拖慢启动
+class UpstreamClient:
+    def __init__(self, base_url, headers=None, pool_size=10, timeout=(3.05, 10), latency_window=1000, metrics=None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers or {}
+        self.pool_size = pool_size
+        self.metrics = metrics
+        self.timeout = timeout
+        self.latency_window = latency_window
+        self._session = None
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, metrics=None):
+        return cls(
+            config['UPSTREAM_BASE_URL'],
+            headers=config['HEADERS'],
+            pool_size=config['UPSTREAM_POOL_SIZE'],
+            timeout=(config['UPSTREAM_CONNECT_TIMEOUT'], config['UPSTREAM_READ_TIMEOUT']),
+            latency_window=config['UPSTREAM_LATENCY_WINDOW'],
+            metrics=metrics,
+        )
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self.lock:
+                if self._session is None:
+                    self._session = self.create_session()
+        return self._session
+
+    def create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        session.headers.update(self.headers)
+        # 重试由调用方决定，连接池只负责复用连接
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    # endpoint 是统计用的接口名，如 yuyue / yuyueIn / saveYuyue / tuikuan
+    # 网络错误和 HTTP 4xx/5xx 均抛出 UpstreamError
+    def request(self, method, endpoint, path, **kwargs):
+        import requests
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = session.request(method, self.url(path), **kwargs)
+            status = response.status_code
+            response.raise_for_status()
+            return response
+        except requests.RequestException as e:
+            raise UpstreamError(str(e)) from e
+        finally:
+            self.record(endpoint, status, time.perf_counter() - started)
+
+    def get(self, endpoint, path, **kwargs):
+        return self.request('GET', endpoint, path, **kwargs)
+
+    def post(self, endpoint, path, **kwargs):
+        return self.request('POST', endpoint, path, **kwargs)
+
+    def record(self, endpoint, status, seconds):
+        with self.lock:
+            stats = self.stats.get(endpoint)
+            if stats is None:
+                stats = self.stats[endpoint] = EndpointStats(self.latency_window)
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.latencies.append(seconds)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if status == 'error' or status >= 400:
+                stats.errors += 1
+        if self.metrics is not None:
+            self.metrics.upstream_requests.observe(seconds, endpoint=endpoint, status=status)
+
+    def stats_snapshot(self):
+        with self.lock:
+            return {endpoint: stats.as_dict() for endpoint, stats in self.stats.items()}
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+def get_upstream():
+    return current_app.extensions['upstream']
+
+
+# 一次进行中的 yyp_pass 获取，同一场馆的并发请求等待同一个结果
+class _PendingToken:
+    __slots__ = ('done', 'token')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.token = None
+
+
+# 按场馆缓存 yyp_pass：有效期内直接复用，过期后同一场馆只有一个请求去上游获取
+class YypPassCache:
+    def __init__(self, ttl=60, wait_timeout=30):
+        self.ttl = ttl  # 秒，为 0 时不缓存，只合并并发获取
+        self.wait_timeout = wait_timeout
+        self.tokens = {}  # 场馆编号 -> (过期时间, yyp_pass)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # 有效期内的 yyp_pass，没有时返回 None；异步接口用它和 store 自行合并并发获取
+    def peek(self, venue_id):
+        with self.lock:
+            return self._lookup(venue_id)
+
+    def store(self, venue_id, token):
+        with self.lock:
+            self._store(venue_id, token)
+
+    def _lookup(self, venue_id):
+        entry = self.tokens.get(venue_id)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def _store(self, venue_id, token):
+        if token and self.ttl > 0:
+            self.tokens[venue_id] = (time.monotonic() + self.ttl, token)
+
+    # 返回 (yyp_pass, 是否来自缓存)，fetch 负责实际请求上游，失败时返回 None
+    def get(self, venue_id, fetch):
+        with self.lock:
+            token = self._lookup(venue_id)
+            if token:
+                return token, True
+            pending = self.pending.get(venue_id)
+            leader = pending is None
+            if leader:
+                pending = self.pending[venue_id] = _PendingToken()
+
+        if not leader:
+            pending.done.wait(self.wait_timeout)
+            return pending.token, False
+
+        try:
+            pending.token = fetch()
+        finally:
+            with self.lock:
+                self._store(venue_id, pending.token)
+                del self.pending[venue_id]
+            pending.done.set()
+        return pending.token, False
+
+    # 上游拒绝了该 yyp_pass；只在缓存的仍是同一个值时删除，避免误删别人刚取到的新值
+    def invalidate(self, venue_id, token):
+        with self.lock:
+            entry = self.tokens.get(venue_id)
+            if entry and entry[1] == token:
+                del self.tokens[venue_id]
+
+    def stats_snapshot(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'cached_venues': len(self.tokens)}
+
+
+def get_yyp_pass_cache():
+    return current_app.extensions['yyp_pass_cache']
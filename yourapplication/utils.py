@@ -1,141 +1,1012 @@
 # yourapplication/utils.py
 
 import asyncio
-import aiohttp
-import random
-from bs4 import BeautifulSoup
+import functools
+import logging
+import sqlite3
+import time
 from flask import current_app
-from yourapplication.models import db, Order
+from datetime import date, datetime
+from yourapplication.models import (
+    db, ArchivedOrder, ArchivedReservation, DataVersion, Order, OrderSlot, PageState, Reservation, SyncState,
+    TerminalOrder,
+    ORDERS_DATA_VERSION, SYNC_STATE_KEY
+)
+from yourapplication.parsers import APPROVED_MARKER, parse_page
+from yourapplication.parse_pool import ParseBatcher, get_parse_executor
+from yourapplication.page_archive import get_page_archive
+from yourapplication.page_cache import PageCache, content_hash, load_page_cache, save_page_states
+from yourapplication.metrics import get_metrics
+from yourapplication.order_events import get_order_events
+from yourapplication.retry import FetchControls
+from yourapplication.upstream import get_upstream
+from yourapplication.venues import UNKNOWN_VENUE_RANK, get_venue_catalog
+from sqlalchemy import bindparam, delete, func, insert, inspect, literal, or_, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 
+# 应用日志器（yourapplication）的子日志器，级别可通过 LOG_LEVELS 单独调整
+logger = logging.getLogger(__name__)
+
+# 订单字典中与 Order 表对应的字段，yuyue_id 为冲突判定键
+ORDER_COLUMNS = ('yuyue_id', 'venue', 'name', 'phone', 'date', 'time')
+
+# 由场馆名称在场馆目录中查出的整数列
+VENUE_KEY_COLUMNS = ('venue_id', 'venue_rank')
+
+# 入库时由订单字段派生的列：场馆编号、排序位置和日期序数
+DERIVED_COLUMNS = VENUE_KEY_COLUMNS + ('day',)
+
+SYNC_MODES = ('incremental', 'full', 'auto', 'replay', 'reservations')
+# 不需要指定 yuyue_id 范围的同步模式
+RANGELESS_SYNC_MODES = ('auto', 'reservations')
+
 # 更新数据库的函数，根据用户指定的 yuyue_id 范围
-def update_database_with_range(start_id, end_id):
+# incremental：边抓取边按 yuyue_id 增量写入，只删除范围内不再审核通过的订单
+# full：抓取完成后清空订单表再整体插入
+# auto：忽略传入范围，从已记录的最高 yuyue_id 向后扫描，直到连续多次未命中
+# replay：不访问网络，从页面归档中取每个 ID 最近一次的页面重新解析，按增量方式写入
+# reservations：忽略传入范围，只刷新自己提交的、预约日期未过的订单
+def update_database_with_range(start_id, end_id, mode='incremental', stats=None):
+    logger.info(f"开始更新数据库，范围：{start_id} - {end_id}，模式：{mode}")
+    stats = stats if stats is not None else ScanStats()
+
+    if mode == 'auto':
+        asyncio.run(sync_orders_auto(stats))
+    elif mode == 'full':
+        # 异步获取新的订单数据
+        new_orders = asyncio.run(fetch_new_orders(start_id, end_id, stats=stats))
+
+        write_started = time.monotonic()
+        # 清空原有的订单数据
+        delete_all_orders()
+
+        # 插入新的订单到数据库
+        if insert_new_orders(new_orders) or not new_orders:
+            save_page_states(stats.take_page_states())
+        stats.written = len(new_orders)
+        stats.write_seconds += time.monotonic() - write_started
+    elif mode == 'replay':
+        asyncio.run(sync_order_ids(range(start_id, end_id + 1), stats, replay=True))
+    elif mode == 'reservations':
+        asyncio.run(sync_reservations(stats))
+    else:
+        asyncio.run(sync_orders_in_range(start_id, end_id, stats))
+
+    # 只刷新零散的几个 ID 时不推进水位线，否则自动同步会跳过中间未扫描的 ID
+    record_sync_progress(stats, advance_high_water_mark=mode != 'reservations')
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.observe_scan(mode, stats)
+    logger.info(f"数据库更新完成，写入 {stats.written} 条，删除 {stats.deleted} 条", extra={'scan': stats.as_dict(), 'mode': mode})
+    return stats
+
+# 增量同步：按块提交 upsert，扫描结束后删除范围内已失效的订单
+async def sync_orders_in_range(start_id, end_id, stats):
+    return await sync_order_ids(range(start_id, end_id + 1), stats)
+
+# 增量同步一组 yuyue_id，返回其中审核通过的 ID 集合
+# replay 为 True 时页面来自归档，没有归档的 ID 视为未扫描，保留原有记录
+async def sync_order_ids(ids, stats, replay=False):
+    chunk_size = current_app.config['SYNC_CHUNK_SIZE']
+    if replay:
+        source = iter_archived_orders(ids, stats)
+        ids = stats.replayed_ids
+    else:
+        source = iter_orders(ids, stats=stats)
+    seen_ids = set()
+    written_ids = set()
+    chunk = []
+
+    def flush():
+        write_started = time.monotonic()
+        stats.written += upsert_orders(chunk)
+        written_ids.update(order_data['yuyue_id'] for order_data in chunk)
+        save_page_states(stats.take_page_states(written_ids))
+        stats.write_seconds += time.monotonic() - write_started
+
+    async for order_data in source:
+        seen_ids.add(order_data['yuyue_id'])
+        # 页面未变化的订单已在库中，不再写入
+        if order_data['yuyue_id'] in stats.unchanged_ids:
+            continue
+        chunk.append(order_data)
+        if len(chunk) >= chunk_size:
+            flush()
+            chunk = []
+    flush()
+
+    # 抓取失败的 ID 状态未知，保留原有记录
+    keep_ids = seen_ids | set(stats.failed_ids)
+    write_started = time.monotonic()
+    stats.deleted += delete_stale_orders(ids, keep_ids)
+    stats.write_seconds += time.monotonic() - write_started
+    return seen_ids
+
+# 自动同步：先复查水位线之前的一小段（等待审核的预约可能稍后通过），
+# 再从水位线向后分段扫描，直到最后一次命中之后连续 AUTO_SYNC_MAX_MISSES 个 ID 都未命中
+async def sync_orders_auto(stats):
     app = current_app
-    app.logger.info(f"开始更新数据库，范围：{start_id} - {end_id}")
+    config = app.config
+    max_misses = config['AUTO_SYNC_MAX_MISSES']
+    max_ids = config['AUTO_SYNC_MAX_IDS']
+    high_water_mark = get_high_water_mark()
+    terminal_ids = get_terminal_ids()
 
-    # 异步获取新的订单数据
-    new_orders = asyncio.run(fetch_new_orders(start_id, end_id))
+    lookback_start = max(1, high_water_mark - config['AUTO_SYNC_LOOKBACK'] + 1)
+    lookback_ids = [
+        yuyue_id for yuyue_id in range(lookback_start, high_water_mark + 1)
+        if yuyue_id not in terminal_ids
+    ]
+    logger.info(f"自动同步：水位线 {high_water_mark}，复查 {len(lookback_ids)} 个ID")
+    if lookback_ids:
+        await sync_order_ids(lookback_ids, stats)
 
-    # 清空原有的订单数据
-    delete_all_orders()
+    last_seen = high_water_mark
+    next_id = high_water_mark + 1
+    scanned = 0
+    while next_id <= last_seen + max_misses and scanned < max_ids:
+        window_end = min(last_seen + max_misses, next_id + max_ids - scanned - 1)
+        await sync_order_ids(range(next_id, window_end + 1), stats)
+        scanned += window_end - next_id + 1
+        last_seen = max(last_seen, stats.max_seen_id)
+        next_id = window_end + 1
+    logger.info(f"自动同步：向后扫描 {scanned} 个ID，最后命中 {last_seen}")
 
-    # 插入新的订单到数据库
-    insert_new_orders(new_orders)
+# 定向刷新：只抓取 reservations 表中预约日期未过的 yuyue_id，审核状态记入订单表和页面指纹
+async def sync_reservations(stats):
+    ids = get_upcoming_reservation_ids(stats.today)
+    logger.info(f"刷新自己提交的预约：{len(ids)} 个ID")
+    if ids:
+        await sync_order_ids(ids, stats)
 
-    app.logger.info("数据库更新完成")
+# 预约日期不早于 today 的去重 yuyue_id
+def get_upcoming_reservation_ids(today):
+    return db.session.scalars(
+        select(Reservation.yuyue_id)
+        .where(Reservation.day >= day_number(today), Reservation.yuyue_id.is_not(None))
+        .distinct()
+        .order_by(Reservation.yuyue_id)
+    ).all()
 
 # 删除所有订单
 def delete_all_orders():
-    app = current_app
     try:
+        db.session.execute(delete(OrderSlot.__table__))
         num_deleted = db.session.query(Order).delete()
+        bump_data_version()
         db.session.commit()
-        app.logger.info(f"已删除 {num_deleted} 条订单记录")
+        publish_order_changes(reset=True)
+        logger.info(f"已删除 {num_deleted} 条订单记录")
     except SQLAlchemyError as e:
         db.session.rollback()
-        app.logger.error(f"删除所有订单时数据库错误：{e}")
+        logger.error(f"删除所有订单时数据库错误：{e}")
+
+# 抓取过程的统计信息，用于调节并发上限
+class ScanStats:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.pages = 0  # 已完成的 ID 数
+        self.found = 0  # 审核通过的订单数
+        self.in_flight = 0  # 当前进行中的请求数
+        self.peak_in_flight = 0
+        self.latencies = []  # 每个 ID 从开始请求到处理完成的耗时（秒）
+        self.failed_ids = []  # 重试耗尽仍未取到页面的 ID
+        self.written = 0  # 实际写入（新增或变更）的行数
+        self.deleted = 0  # 删除的失效订单数
+        self.max_seen_id = 0  # 本次扫描中确认存在的最大 yuyue_id
+        self.terminal_ids = {}  # 已进入终态的 ID -> 原因（cancelled / past_date）
+        self.retries = 0  # 重试次数
+        self.backoff_seconds = 0.0  # 重试前退避等待的总时长
+        self.rate_limit_wait = 0.0  # 等待限速令牌的总时长
+        self.breaker_trips = 0  # 熔断次数
+        self.breaker_paused = 0.0  # 熔断暂停的总时长
+        self.page_hits = 0  # 页面未变化、跳过解析的 ID 数
+        self.page_misses = 0  # 页面有变化或首次抓取的 ID 数
+        self.unchanged_ids = set()  # 页面未变化的审核通过订单，增量同步时跳过写库
+        self.page_states = []  # 待保存的页面指纹
+        self.parse_seconds = 0.0  # 解析页面（含等待解析池）的总耗时
+        self.replayed_ids = set()  # replay 模式下在归档中找到页面的 ID
+        self.archive_misses = 0  # replay 模式下归档中没有页面的 ID 数
+        self.write_seconds = 0.0  # 写库的总耗时
+        self.log_counts = {}  # 逐 ID 日志按类别计数
+        self.suppressed_logs = {}  # 超过上限后未输出的条数，按类别汇总
+        self.today = date.today().strftime('%Y-%m-%d')
+
+    def request_started(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return time.monotonic()
+
+    def request_finished(self, yuyue_id, order_data, started_at=None):
+        self.in_flight -= 1
+        self.pages += 1
+        if started_at is not None:
+            self.latencies.append(time.monotonic() - started_at)
+        if order_data:
+            self.found += 1
+            self.max_seen_id = max(self.max_seen_id, yuyue_id)
+            if order_data['date'] and order_data['date'] < self.today:
+                self.terminal_ids[yuyue_id] = 'past_date'
+
+    def record_retry(self, delay):
+        self.retries += 1
+        self.backoff_seconds += delay
+
+    # 同类逐 ID 日志在一次扫描中只输出前 limit 条，其余汇总到扫描结束的统计中
+    def should_log(self, key, limit):
+        count = self.log_counts.get(key, 0) + 1
+        self.log_counts[key] = count
+        if count <= limit:
+            return True
+        self.suppressed_logs[key] = self.suppressed_logs.get(key, 0) + 1
+        return False
+
+    # 取出可以保存的页面指纹；审核通过的页面要等订单写入后（在 written_ids 中）才保存
+    def take_page_states(self, written_ids=None):
+        ready, pending = [], []
+        for row in self.page_states:
+            if written_ids is None or row['status'] != 'approved' or row['yuyue_id'] in written_ids:
+                ready.append(row)
+            else:
+                pending.append(row)
+        self.page_states = pending
+        return ready
+
+    def record_terminal(self, yuyue_id, reason):
+        self.max_seen_id = max(self.max_seen_id, yuyue_id)
+        self.terminal_ids[yuyue_id] = reason
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def pages_per_sec(self):
+        elapsed = self.elapsed
+        return self.pages / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'pages': self.pages,
+            'found': self.found,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'failed': len(self.failed_ids),
+            'written': self.written,
+            'deleted': self.deleted,
+            'terminal': len(self.terminal_ids),
+            'max_seen_id': self.max_seen_id,
+            'retries': self.retries,
+            'backoff_seconds': round(self.backoff_seconds, 3),
+            'rate_limit_wait': round(self.rate_limit_wait, 3),
+            'breaker_trips': self.breaker_trips,
+            'breaker_paused': round(self.breaker_paused, 3),
+            'page_hits': self.page_hits,
+            'page_misses': self.page_misses,
+            'parse_seconds': round(self.parse_seconds, 3),
+            'write_seconds': round(self.write_seconds, 3),
+            'archive_misses': self.archive_misses,
+            'suppressed_logs': dict(self.suppressed_logs),
+            'elapsed': round(self.elapsed, 3),
+            'pages_per_sec': round(self.pages_per_sec, 2),
+        }
+
+# 创建共享连接池的会话，复用 keep-alive 连接；aiohttp 在第一次扫描时才导入
+def create_fetch_session(concurrency):
+    import aiohttp
+    config = current_app.config
+    connector = aiohttp.TCPConnector(
+        limit=concurrency,
+        limit_per_host=min(concurrency, config['FETCH_LIMIT_PER_HOST']),
+        keepalive_timeout=config['FETCH_KEEPALIVE_TIMEOUT'],
+    )
+    return aiohttp.ClientSession(connector=connector)
 
 # 异步获取新订单数据
-async def fetch_new_orders(start_id, end_id):
+async def fetch_new_orders(start_id, end_id, concurrency=None, stats=None):
+    return [order_data async for order_data in iter_new_orders(start_id, end_id, concurrency, stats)]
+
+# 按 yuyue_id 范围抓取订单
+def iter_new_orders(start_id, end_id, concurrency=None, stats=None):
+    logger.info(f"开始获取新订单，范围：{start_id} - {end_id}")
+    return iter_orders(range(start_id, end_id + 1), concurrency, stats)
+
+# 以生产者/消费者方式抓取订单，按完成顺序逐条产出审核通过的订单
+async def iter_orders(ids, concurrency=None, stats=None):
     app = current_app
-    app.logger.info(f"开始获取新订单，范围：{start_id} - {end_id}")
-    tasks = []
+    concurrency = concurrency or app.config['FETCH_CONCURRENCY']
+    stats = stats if stats is not None else ScanStats()
     headers = app.config['HEADERS']
-    async with aiohttp.ClientSession() as session:
-        # 创建获取每个订单的任务列表
-        for yuyue_id in range(start_id, end_id + 1):
-            tasks.append(fetch_order(session, yuyue_id, headers))
-        results = await asyncio.gather(*tasks)
-    return [result for result in results if result]  # 过滤掉 None 的结果
-
-# 异步获取单个订单的函数，带重试机制和随机延迟
-async def fetch_order(session, yuyue_id, headers, retries=5):
+    batcher = create_parse_batcher()
+    controls = FetchControls.from_config(app.config, logger)
+    page_cache = load_page_cache(ids)
+    archive = get_page_archive()
+    logger.info(f"开始获取订单，并发上限：{concurrency}，解析方式：{app.config['PARSE_EXECUTOR']}")
+
+    id_queue = asyncio.Queue(maxsize=concurrency * 2)
+    result_queue = asyncio.Queue(maxsize=concurrency)
+    done = object()  # 工作协程结束的标记
+
+    async def produce():
+        for yuyue_id in ids:
+            await id_queue.put(yuyue_id)
+        for _ in range(concurrency):
+            await id_queue.put(None)
+
+    async def consume(session):
+        try:
+            while True:
+                yuyue_id = await id_queue.get()
+                if yuyue_id is None:
+                    break
+                started_at = stats.request_started()
+                order_data = None
+                try:
+                    order_data = await fetch_order(session, yuyue_id, headers, stats=stats, batcher=batcher,
+                                                   controls=controls, page_cache=page_cache, archive=archive)
+                finally:
+                    stats.request_finished(yuyue_id, order_data, started_at)
+                if order_data:
+                    await result_queue.put(order_data)
+        except Exception as e:
+            logger.error(f"抓取协程异常退出：{e}")
+        await result_queue.put(done)
+
+    async with create_fetch_session(concurrency) as session:
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(consume(session)) for _ in range(concurrency)]
+        try:
+            remaining = concurrency
+            while remaining:
+                item = await result_queue.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if archive is not None:
+                archive.flush()
+            stats.breaker_trips += controls.breaker.trips
+            stats.breaker_paused += controls.breaker.paused_seconds
+            stats.finish()
+            # 逐 ID 的日志已降为 DEBUG 或按上限抽样，这里输出整次扫描的汇总
+            summary = stats.as_dict()
+            logger.info(f"订单获取结束：扫描 {summary['pages']} 个ID，命中 {summary['found']}，"
+                        f"失败 {summary['failed']}，重试 {summary['retries']}，"
+                        f"未输出的逐 ID 日志 {summary['suppressed_logs']}", extra={'scan': summary})
+
+# 异步获取单个订单：按重试策略退避重试，每次请求前经过熔断器和令牌桶限速
+# 传入 page_cache 时发送条件请求，页面未变化则直接使用上次的解析结果（需要同时传入 stats）
+# 传入 archive 时把取到的新页面写入归档；未变化的页面上次已经归档过
+async def fetch_order(session, yuyue_id, headers, stats=None, batcher=None, controls=None, page_cache=None,
+                      archive=None):
+    # 页面指纹和未变化的订单都记在 stats 中，由调用方在写库后保存
+    if page_cache is not None and stats is None:
+        raise ValueError("传入 page_cache 时必须同时传入 stats")
     app = current_app
-    url = f"https://cgyytyb.cpu.edu.cn/wap/yuyueIn?id={yuyue_id}"
-    for attempt in range(retries):
+    controls = controls or FetchControls.from_config(app.config, logger)
+    policy = controls.policy
+    log_limit = app.config['LOG_SAMPLE_LIMIT']
+    upstream = get_upstream()
+    url = f"{app.config['UPSTREAM_BASE_URL']}/wap/yuyueIn?id={yuyue_id}"
+    if page_cache is not None:
+        headers = {**headers, **page_cache.conditional_headers(yuyue_id)}
+    for attempt in range(policy.max_attempts):
+        probe = await controls.breaker.before_call()
+        waited = await controls.limiter.acquire()
+        if stats is not None:
+            stats.rate_limit_wait += waited
+        retry_after = None
+        success = False
+        rejected = False
+        content = None
+        http_status = 'error'
+        request_started = time.perf_counter()
         try:
             # 发起 GET 请求获取订单内容
-            async with session.get(url, headers=headers, timeout=20) as response:
-                content = await response.text()
-                order_data = extract_order_info(yuyue_id, content)
-                # 随机延迟，防止反爬
-                await asyncio.sleep(random.uniform(0.5, 1.5))
-                return order_data
-        except asyncio.TimeoutError:
-            app.logger.error(f"获取订单 {yuyue_id} 时连接超时，重试 {attempt + 1}/{retries}")
-            await asyncio.sleep(random.uniform(1, 2))  # 延迟后重试
+            async with session.get(url, headers=headers, timeout=app.config['FETCH_TIMEOUT']) as response:
+                http_status = response.status
+                if policy.should_retry_status(response.status):
+                    retry_after = policy.retry_after(response.headers)
+                    error = f"HTTP {response.status}"
+                elif response.status == 304 and page_cache is not None and page_cache.unchanged(yuyue_id):
+                    success = True
+                elif 200 <= response.status < 300:
+                    content = await response.text()
+                    response_headers = response.headers
+                    success = True
+                else:
+                    # 其他状态码（401、403、404 等）的页面不是订单详情，按失败处理且不重试，
+                    # 不解析、不归档也不记录页面指纹，范围同步时不会因此删除已有订单
+                    rejected = True
+                    error = f"HTTP {response.status}"
+        except policy.retryable_errors as e:
+            error = repr(e)
         except Exception as e:
-            app.logger.error(f"获取订单 {yuyue_id} 时出错：{e}")
-            await asyncio.sleep(random.uniform(1, 2))  # 延迟后重试
+            logger.error(f"获取订单 {yuyue_id} 时出错，不再重试：{e}")
+            break
+        finally:
+            controls.breaker.record(success, probe)
+            upstream.record('yuyueIn', http_status, time.perf_counter() - request_started)
+
+        if rejected:
+            if stats is None or stats.should_log('failed', log_limit):
+                logger.error(f"获取订单 {yuyue_id} 失败：{error}，不再重试")
+            break
+        if success:
+            page_hash = None
+            if page_cache is not None:
+                page_hash = content_hash(content) if content is not None else None
+                state = page_cache.unchanged(yuyue_id, page_hash)
+                if state is not None:
+                    return reuse_page_state(yuyue_id, state, stats)
+                stats.page_misses += 1
+            if archive is not None:
+                archive.append(yuyue_id, content)
+
+            parse_started = time.monotonic()
+            if batcher is None:
+                order_data = extract_order_info(yuyue_id, content)
+            else:
+                order_data = await extract_order_info_async(yuyue_id, content, batcher)
+            if stats is not None:
+                stats.parse_seconds += time.monotonic() - parse_started
+            terminal = order_data is None and is_terminal_page(content)
+            if terminal and stats is not None:
+                stats.record_terminal(yuyue_id, 'cancelled')
+            if page_cache is not None:
+                status = 'approved' if order_data else 'terminal' if terminal else 'other'
+                stats.page_states.append(PageCache.make_state(yuyue_id, page_hash, response_headers, status, order_data))
+            return order_data
+
+        if attempt + 1 < policy.max_attempts:
+            delay = policy.backoff(attempt, retry_after)
+            if stats is not None:
+                stats.record_retry(delay)
+            if stats is None or stats.should_log('retry', log_limit):
+                logger.warning(f"获取订单 {yuyue_id} 失败：{error}，{delay:.2f}s 后重试 {attempt + 1}/{policy.max_attempts - 1}")
+            await asyncio.sleep(delay)
+        elif stats is None or stats.should_log('failed', log_limit):
+            logger.error(f"获取订单 {yuyue_id} 失败：{error}，已达到重试上限")
+    if stats is not None:
+        stats.failed_ids.append(yuyue_id)
     return None  # 在多次重试失败后返回 None
 
-# 插入新订单到数据库
+# 从页面归档中逐个取出最近一次的页面重新解析，不访问网络；按完成顺序产出审核通过的订单
+async def iter_archived_orders(ids, stats):
+    archive = get_page_archive()
+    if archive is None:
+        raise RuntimeError("未启用页面归档（PAGE_ARCHIVE_ENABLED），无法使用 replay 模式")
+    ids = list(ids)
+    logger.info(f"开始从归档重放订单，共 {len(ids)} 个ID")
+    try:
+        for yuyue_id, _, content in archive.iter_pages(ids):
+            stats.replayed_ids.add(yuyue_id)
+            started_at = stats.request_started()
+            order_data = None
+            try:
+                parse_started = time.monotonic()
+                order_data = extract_order_info(yuyue_id, content)
+                stats.parse_seconds += time.monotonic() - parse_started
+                if order_data is None and is_terminal_page(content):
+                    stats.record_terminal(yuyue_id, 'cancelled')
+            finally:
+                stats.request_finished(yuyue_id, order_data, started_at)
+            if order_data:
+                yield order_data
+    finally:
+        stats.archive_misses += len(ids) - len(stats.replayed_ids)
+        stats.finish()
+        logger.info(f"归档重放结束：重放 {len(stats.replayed_ids)} 个ID，命中 {stats.found}，"
+                    f"归档中缺失 {stats.archive_misses}", extra={'scan': stats.as_dict()})
+
+# 页面未变化：沿用上次的结果，审核通过的订单记入 unchanged_ids，增量同步时不再写库
+def reuse_page_state(yuyue_id, state, stats):
+    stats.page_hits += 1
+    if state.status == 'terminal':
+        stats.record_terminal(yuyue_id, 'cancelled')
+    order_data = PageCache.order_data(state)
+    if order_data:
+        stats.unchanged_ids.add(yuyue_id)
+    return order_data
+
+# 根据配置创建解析批处理器，inline 模式返回 None
+def create_parse_batcher():
+    config = current_app.config
+    executor = get_parse_executor(config['PARSE_EXECUTOR'], config['PARSE_WORKERS'])
+    if executor is None:
+        return None
+    return ParseBatcher(executor, config['ORDER_PARSER'], config['PARSE_BATCH_SIZE'])
+
+# SQLite 单条语句允许的绑定参数数量，旧版本 SQLite 为 999
+@functools.lru_cache(maxsize=None)
+def sqlite_max_variables():
+    try:
+        return sqlite3.connect(':memory:').getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    except AttributeError:
+        return 999
+
+# 批量写入每块的行数，不超过参数上限折算的行数和配置的分块大小
+def bulk_chunk_size(column_count=len(ORDER_COLUMNS) + len(DERIVED_COLUMNS)):
+    return max(1, min(current_app.config['BULK_INSERT_CHUNK_SIZE'], sqlite_max_variables() // column_count))
+
+def iter_chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+# 'YYYY-MM-DD' 格式的日期转为序数（date.toordinal()），无法解析时返回 None
+def day_number(value):
+    try:
+        return date.fromisoformat(value.strip()).toordinal()
+    except (AttributeError, ValueError):
+        return None
+
+# 订单字典转为 orders 表的一行，补上场馆编号、排序位置和日期序数
+def order_row(order_data, catalog):
+    row = {column: order_data[column] for column in ORDER_COLUMNS}
+    row['venue_id'], row['venue_rank'] = catalog.key_of(order_data['venue'])
+    row['day'] = day_number(order_data['date'])
+    return row
+
+# 插入新订单到数据库，使用 Core executemany 分块写入，返回每块的行数和耗时
 def insert_new_orders(orders):
-    app = current_app
+    catalog = get_venue_catalog()
+    timings = []
     try:
-        for order_data in orders:
-            # 创建新的 Order 对象并添加到数据库
-            order = Order(
-                yuyue_id=order_data['yuyue_id'],
-                venue=order_data['venue'],
-                name=order_data['name'],
-                phone=order_data['phone'],
-                date=order_data['date'],
-                time=order_data['time']
-            )
-            db.session.add(order)
+        for chunk in iter_chunks(orders, bulk_chunk_size()):
+            started = time.perf_counter()
+            db.session.execute(insert(Order.__table__), [order_row(order_data, catalog) for order_data in chunk])
+            replace_order_slots(chunk)
+            timings.append({'rows': len(chunk), 'seconds': time.perf_counter() - started})
+        if orders:
+            bump_data_version()
         db.session.commit()  # 提交所有订单
-        app.logger.info(f"已插入订单数量: {len(orders)}")
+        publish_order_changes(upserted=orders)
+        logger.info(f"已插入订单数量: {len(orders)}，分 {len(timings)} 块，"
+                        f"耗时 {sum(timing['seconds'] for timing in timings):.3f}s")
+        return timings
     except SQLAlchemyError as e:
         db.session.rollback()  # 出现错误时回滚
-        app.logger.error(f"插入新订单时数据库错误：{e}")
+        logger.error(f"插入新订单时数据库错误：{e}")
+        return []
 
-# 提取订单信息的函数
-def extract_order_info(yuyue_id, content):
+# 上游已确认取消：记为终态并删除页面指纹，由调用方负责提交
+# 预约列表据此显示为已取消，之后的扫描也不会沿用取消前审核通过的页面
+def record_cancelled(yuyue_ids):
+    for chunk in iter_chunks(list(yuyue_ids), bulk_chunk_size(3)):
+        stmt = sqlite_insert(TerminalOrder).values([
+            {'yuyue_id': yuyue_id, 'reason': 'cancelled', 'recorded_at': datetime.now()} for yuyue_id in chunk
+        ])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[TerminalOrder.yuyue_id],
+            set_={'reason': stmt.excluded.reason, 'recorded_at': stmt.excluded.recorded_at},
+        ))
+        db.session.execute(delete(PageState).where(PageState.yuyue_id.in_(chunk)))
+
+# 删除一个已在上游取消的订单及其时间段并记录取消，订单不存在时返回 False；数据库错误由调用方处理
+def delete_order(yuyue_id):
+    order = Order.query.filter_by(yuyue_id=yuyue_id).first()
+    try:
+        if order:
+            db.session.delete(order)
+            bump_data_version()
+        record_cancelled([yuyue_id])
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    if not order:
+        return False
+    publish_order_changes(removed=[yuyue_id])
+    logger.info(f"取消订单 {yuyue_id}")
+    return True
+
+# 在一个事务中删除一批已在上游取消的订单及其时间段并记录取消，返回实际删除的 yuyue_id 集合
+def delete_orders(yuyue_ids):
+    table = Order.__table__
+    deleted = set()
+    try:
+        for chunk in iter_chunks(list(yuyue_ids), bulk_chunk_size(1)):
+            deleted.update(db.session.scalars(select(table.c.yuyue_id).where(table.c.yuyue_id.in_(chunk))))
+            delete_order_slots(chunk)
+            db.session.execute(delete(table).where(table.c.yuyue_id.in_(chunk)))
+        if deleted:
+            bump_data_version()
+        record_cancelled(yuyue_ids)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    publish_order_changes(removed=sorted(deleted))
+    if deleted:
+        logger.info(f"批量取消订单 {len(deleted)} 条")
+    return deleted
+
+# 保存用户提交成功的预约；数据库错误由调用方处理
+def save_reservation(yuyue_id, venue, name, phone, date, time):
+    try:
+        db.session.add(Reservation(yuyue_id=yuyue_id, venue=venue, name=name, phone=phone, date=date,
+                                   day=day_number(date), time=time))
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+    logger.info(f"保存预约 {yuyue_id}")
+
+# 按 yuyue_id 批量 upsert 订单，只有内容变化的行才会被更新，返回实际写入行数
+def upsert_orders(orders):
+    if not orders:
+        return 0
+    try:
+        # 直接针对表执行 Core 语句，executemany 复用同一条编译好的语句
+        catalog = get_venue_catalog()
+        table = Order.__table__
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.yuyue_id],
+            set_={column: stmt.excluded[column] for column in ORDER_COLUMNS[1:] + DERIVED_COLUMNS},
+            where=or_(*[
+                table.c[column].is_distinct_from(stmt.excluded[column])
+                for column in ORDER_COLUMNS[1:]
+            ]),
+        )
+        written = 0
+        changed = []  # 新增或有字段变化的订单，提交后推送给订单页面
+        for chunk in iter_chunks(orders, bulk_chunk_size()):
+            existing = {
+                row.yuyue_id: row
+                for row in db.session.execute(
+                    select(*[table.c[column] for column in ORDER_COLUMNS])
+                    .where(table.c.yuyue_id.in_([order_data['yuyue_id'] for order_data in chunk]))
+                )
+            }
+            # 场馆、日期或时间有变化的订单需要重写时间段
+            slot_changes = []
+            for order_data in chunk:
+                row = existing.get(order_data['yuyue_id'])
+                if row is None or any(getattr(row, column) != order_data[column] for column in ORDER_COLUMNS[1:]):
+                    changed.append(order_data)
+                if row is None or (row.venue, row.date, row.time) != (order_data['venue'], order_data['date'], order_data['time']):
+                    slot_changes.append(order_data)
+            replace_order_slots(slot_changes)
+            written += db.session.execute(stmt, [order_row(order_data, catalog) for order_data in chunk]).rowcount
+        if written:
+            bump_data_version()
+        db.session.commit()
+        publish_order_changes(upserted=changed)
+        logger.info(f"upsert 订单 {len(orders)} 条，实际写入 {written} 条")
+        return written
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"upsert 订单时数据库错误：{e}")
+        return 0
+
+# 删除已扫描 ID 中不在 keep_ids 里的订单，返回删除数量
+def delete_stale_orders(scanned_ids, keep_ids):
     app = current_app
-    soup = BeautifulSoup(content, 'html.parser')
-    order_data = {}
+    chunk_size = app.config['SYNC_CHUNK_SIZE']
+    scanned_ids = set(scanned_ids)
+    if not scanned_ids:
+        return 0
     try:
-        if '审核通过，可以进场' in content:
-            # 找到预约场馆
-            venue_label = soup.find('label', string='预约场馆')
-            if not venue_label:
-                app.logger.error(f"无法找到预约场馆标签，yuyue_id={yuyue_id}")
-                return None
-            venue = venue_label.find_next_sibling('div').text.strip()
-
-            # 找到预约姓名和电话
-            name_hp_div = soup.find('label', string='预约姓名').find_next_sibling('div')
-            if not name_hp_div:
-                app.logger.error(f"无法找到预约姓名标签，yuyue_id={yuyue_id}")
-                return None
-            name = name_hp_div.contents[0].strip()
-            phone = name_hp_div.find('span').text.strip() if name_hp_div.find('span') else ''
-
-            # 找到预约时间
-            date_time_div = soup.find('label', string='预约时间').parent
-            date_span = date_time_div.find('span', style='font-weight:600;margin-right:1rem')
-            date = date_span.text.strip() if date_span else ''
-
-            time_em = date_time_div.find('em')
-            time_info = time_em.text.strip() if time_em else ''
-
-            # 组装订单信息字典
-            order_data = {
-                'yuyue_id': yuyue_id,
-                'venue': venue,
-                'name': name,
-                'phone': phone,
-                'date': date,
-                'time': time_info
+        existing_ids = db.session.scalars(
+            select(Order.yuyue_id).where(Order.yuyue_id.between(min(scanned_ids), max(scanned_ids)))
+        ).all()
+        stale_ids = [
+            yuyue_id for yuyue_id in existing_ids
+            if yuyue_id in scanned_ids and yuyue_id not in keep_ids
+        ]
+        for chunk in iter_chunks(stale_ids, chunk_size):
+            delete_order_slots(chunk)
+            db.session.execute(delete(Order).where(Order.yuyue_id.in_(chunk)))
+            bump_data_version()
+            db.session.commit()
+            publish_order_changes(removed=chunk)
+        if stale_ids:
+            logger.info(f"已删除范围内失效订单 {len(stale_ids)} 条")
+        return len(stale_ids)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"删除失效订单时数据库错误：{e}")
+        return 0
+
+# 把 ';' 分隔的时间段拆成 (时间段, 开始小时) 列表，无法解析的开始小时为 None
+def split_time_slots(time_info):
+    slots = []
+    for slot in (time_info or '').split(';'):
+        slot = slot.strip()
+        if not slot:
+            continue
+        try:
+            start_hour = int(slot.split(':')[0])
+        except ValueError:
+            start_hour = None
+        slots.append((slot, start_hour))
+    return slots
+
+def delete_order_slots(yuyue_ids):
+    table = OrderSlot.__table__
+    for chunk in iter_chunks(list(yuyue_ids), bulk_chunk_size(1)):
+        db.session.execute(delete(table).where(table.c.yuyue_id.in_(chunk)))
+
+# 按订单字典重写其时间段，由调用方负责提交
+def replace_order_slots(orders):
+    if not orders:
+        return
+    catalog = get_venue_catalog()
+    delete_order_slots([order_data['yuyue_id'] for order_data in orders])
+    rows = []
+    for order_data in orders:
+        venue_id, venue_rank = catalog.key_of(order_data['venue'])
+        day = day_number(order_data['date'])
+        rows.extend(
+            {
+                'yuyue_id': order_data['yuyue_id'],
+                'date': order_data['date'],
+                'day': day,
+                'venue_id': venue_id,
+                'venue_rank': venue_rank,
+                'start_hour': start_hour,
+                'time': slot,
             }
-            app.logger.info(f"提取订单 {yuyue_id} 成功")
-        else:
-            # 订单未审核通过或其他状态
-            app.logger.info(f"订单 {yuyue_id} 状态不符")
-            return None
-    except Exception as e:
-        app.logger.error(f"提取订单 {yuyue_id} 时出错：{e}")
+            for slot, start_hour in split_time_slots(order_data['time'])
+        )
+    for chunk in iter_chunks(rows, bulk_chunk_size()):
+        db.session.execute(insert(OrderSlot.__table__), chunk)
+
+# 根据现有订单重建全部时间段，用于迁移旧数据
+def rebuild_order_slots():
+    table = Order.__table__
+    orders = [row._asdict() for row in db.session.execute(select(*[table.c[column] for column in ORDER_COLUMNS]))]
+    db.session.execute(delete(OrderSlot.__table__))
+    for chunk in iter_chunks(orders, bulk_chunk_size()):
+        replace_order_slots(chunk)
+    bump_data_version()
+    db.session.commit()
+    logger.info(f"已为 {len(orders)} 条订单重建时间段")
+    return len(orders)
+
+# 旧版本建立、现已由按场馆编号和日期序数的复合索引取代的索引
+OBSOLETE_INDEXES = ('ix_orders_venue', 'ix_orders_date', 'ix_order_slots_date_rank_hour', 'ix_reservations_date')
+
+def table_columns(connection, table_name):
+    return {column['name'] for column in inspect(connection).get_columns(table_name)}
+
+# 迁移：把旧版本的数据库升级到当前结构，可重复执行，各步骤按依赖顺序进行：
+# 补建缺失的表和列 → 回填场馆编号、排序位置和日期序数 → 删除旧索引、建立新索引 → 按订单重建 order_slots → ANALYZE
+# 索引要等它用到的列都补齐之后才建立，返回重建时间段的订单数
+def upgrade_schema():
+    catalog = get_venue_catalog()
+    table = Order.__table__
+    with db.engine.begin() as connection:
+        db.metadata.create_all(connection)
+        # 时间段表由 orders 派生，结构与当前模型不一致时直接删除后重建，稍后按订单重新填充
+        slot_table = OrderSlot.__table__
+        if table_columns(connection, slot_table.name) != {column.name for column in slot_table.columns}:
+            slot_table.drop(connection)
+            slot_table.create(connection)
+        for model in (Order, Reservation):
+            existing = table_columns(connection, model.__tablename__)
+            for column in model.__table__.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=connection.dialect)
+                    connection.execute(text(f"ALTER TABLE {model.__tablename__} ADD COLUMN {column.name} {column_type}"))
+
+        connection.execute(
+            update(table).where(table.c.venue == bindparam('catalog_name'))
+            .values(venue_id=bindparam('catalog_id'), venue_rank=bindparam('catalog_rank')),
+            [
+                {'catalog_name': venue.name, 'catalog_id': venue.id, 'catalog_rank': venue.rank}
+                for venue in catalog.venues
+            ],
+        )
+        connection.execute(
+            update(table).where(or_(
+                table.c.venue.is_(None),
+                table.c.venue.not_in([venue.name for venue in catalog.venues]),
+            )).values(venue_id=None, venue_rank=UNKNOWN_VENUE_RANK)
+        )
+        for model in (Order, Reservation):
+            model_table = model.__table__
+            # 不同的日期文字很少，按日期逐个回填
+            rows = [
+                {'old_date': value, 'new_day': day_number(value)}
+                for value in connection.scalars(select(model_table.c.date).distinct())
+            ]
+            if rows:
+                connection.execute(
+                    update(model_table).where(model_table.c.date == bindparam('old_date'))
+                    .values(day=bindparam('new_day')),
+                    rows,
+                )
+
+        for name in OBSOLETE_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        for model in (Order, OrderSlot, Reservation):
+            for index in model.__table__.indexes:
+                index.create(connection, checkfirst=True)
+    logger.info("已补全订单的场馆编号、排序位置和日期序数")
+    total = rebuild_order_slots()
+    optimize_database(vacuum_free_ratio=None)
+    return total
+
+# 把 source 表中日期序数早于 cutoff_day 的行分批复制到 archive 表后删除，每批一个事务，返回移动的行数
+# before_delete 在删除每批行之前、同一事务中调用，after_commit 在每批提交后调用，参数都是这批行的 key 列的值
+def archive_rows(source, archive, key, cutoff_day, batch_size, before_delete=None, after_commit=None):
+    columns = [column.name for column in archive.columns if column.name != 'archived_at']
+    moved = 0
+    while True:
+        keys = db.session.scalars(
+            select(source.c[key]).where(source.c.day < cutoff_day).order_by(source.c.day).limit(batch_size)
+        ).all()
+        if not keys:
+            return moved
+        archived_at = literal(datetime.now(), archive.c.archived_at.type)
+        # 同一行再次归档（如重新扫描后又写回热表）时覆盖旧的归档记录
+        db.session.execute(
+            insert(archive).prefix_with('OR REPLACE').from_select(
+                columns + ['archived_at'],
+                select(*[source.c[column] for column in columns], archived_at).where(source.c[key].in_(keys)),
+            )
+        )
+        if before_delete is not None:
+            before_delete(keys)
+        db.session.execute(delete(source).where(source.c[key].in_(keys)))
+        db.session.commit()
+        if after_commit is not None:
+            after_commit(keys)
+        moved += len(keys)
+
+# 数据保留：把预约日期早于 retention_days 天前的订单和预约移到归档表，之后更新统计信息，
+# 空闲页较多时执行 VACUUM；日期无法解析的行不会被归档
+def archive_past_orders(retention_days=None, batch_size=None):
+    config = current_app.config
+    retention_days = config['RETENTION_DAYS'] if retention_days is None else retention_days
+    # 每批的 key 列值作为 IN 参数传入，不超过 SQLite 的参数上限
+    batch_size = min(batch_size or config['RETENTION_BATCH_SIZE'], bulk_chunk_size(1))
+    cutoff_day = date.today().toordinal() - retention_days
+    started = time.monotonic()
+
+    def drop_order_slots(yuyue_ids):
+        delete_order_slots(yuyue_ids)
+        bump_data_version()
+
+    result = {'cutoff': date.fromordinal(cutoff_day).isoformat(), 'orders': 0, 'reservations': 0, 'vacuumed': False}
+    try:
+        result['orders'] = archive_rows(Order.__table__, ArchivedOrder.__table__, 'yuyue_id', cutoff_day,
+                                        batch_size, before_delete=drop_order_slots,
+                                        after_commit=lambda yuyue_ids: publish_order_changes(removed=yuyue_ids))
+        result['reservations'] = archive_rows(Reservation.__table__, ArchivedReservation.__table__, 'id',
+                                              cutoff_day, batch_size)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"归档过期订单时数据库错误：{e}")
+    result['vacuumed'] = optimize_database(config['RETENTION_VACUUM_FREE_RATIO'])
+    result['seconds'] = round(time.monotonic() - started, 3)
+    logger.info(f"已归档 {result['cutoff']} 之前的订单 {result['orders']} 条、预约 {result['reservations']} 条",
+                extra={'retention': result})
+    return result
+
+# 更新查询规划用的统计信息；空闲页占比达到 vacuum_free_ratio 时先执行 VACUUM，为 None 时不执行
+# VACUUM 不能在事务中执行，先结束当前会话的事务，再用自动提交的连接执行；返回是否执行了 VACUUM
+def optimize_database(vacuum_free_ratio):
+    db.session.commit()
+    vacuumed = False
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        if vacuum_free_ratio is not None:
+            page_count = connection.exec_driver_sql("PRAGMA page_count").scalar()
+            free_pages = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+            if page_count and free_pages / page_count >= vacuum_free_ratio:
+                connection.exec_driver_sql("VACUUM")
+                vacuumed = True
+                logger.info(f"已执行 VACUUM，回收 {free_pages}/{page_count} 页")
+        connection.exec_driver_sql("ANALYZE")
+    return vacuumed
+
+# 订单写入提交后推送给打开的订单页面；upserted 为订单字典，removed 为 yuyue_id
+# reset 表示变更无法按行描述（如清空订单表），页面整体刷新
+def publish_order_changes(upserted=(), removed=(), reset=False):
+    broker = get_order_events()
+    if broker is None:
+        return
+    broker.publish(
+        upserted=[{column: order_data[column] for column in ORDER_COLUMNS} for order_data in upserted],
+        removed=list(removed),
+        reset=reset,
+    )
+
+# 读取订单数据版本号，没有记录时为 0
+def get_data_version(name=ORDERS_DATA_VERSION):
+    return db.session.scalar(select(DataVersion.version).where(DataVersion.name == name)) or 0
+
+# 订单数据有写入时版本号加一，并清空本进程的列表缓存；与写入在同一事务中提交
+def bump_data_version(name=ORDERS_DATA_VERSION):
+    stmt = sqlite_insert(DataVersion).values(name=name, version=1, updated_at=datetime.now())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DataVersion.name],
+        set_={'version': DataVersion.version + 1, 'updated_at': stmt.excluded.updated_at},
+    )
+    db.session.execute(stmt)
+    cache = current_app.extensions.get('orders_cache')
+    if cache is not None:
+        cache.clear()
+
+# 读取已记录的最高 yuyue_id
+def get_high_water_mark():
+    state = db.session.get(SyncState, SYNC_STATE_KEY)
+    return state.high_water_mark if state else 0
+
+# 读取已进入终态、无需再抓取的 yuyue_id
+def get_terminal_ids():
+    return set(db.session.scalars(select(TerminalOrder.yuyue_id)).all())
+
+# 保存本次扫描推进的水位线和新发现的终态 ID
+def record_sync_progress(stats, advance_high_water_mark=True):
+    try:
+        if stats.max_seen_id and advance_high_water_mark:
+            stmt = sqlite_insert(SyncState).values(
+                key=SYNC_STATE_KEY, high_water_mark=stats.max_seen_id, updated_at=datetime.now()
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SyncState.key],
+                set_={
+                    'high_water_mark': func.max(SyncState.high_water_mark, stmt.excluded.high_water_mark),
+                    'updated_at': stmt.excluded.updated_at,
+                },
+            )
+            db.session.execute(stmt)
+        if stats.terminal_ids:
+            stmt = sqlite_insert(TerminalOrder).values([
+                {'yuyue_id': yuyue_id, 'reason': reason, 'recorded_at': datetime.now()}
+                for yuyue_id, reason in stats.terminal_ids.items()
+            ])
+            db.session.execute(stmt.on_conflict_do_nothing(index_elements=[TerminalOrder.yuyue_id]))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error(f"保存同步进度时数据库错误：{e}")
+
+# 页面是否表示预约已进入终态（取消、退款等）
+def is_terminal_page(content):
+    return any(marker in content for marker in current_app.config['TERMINAL_PAGE_MARKERS'])
+
+# 提取订单信息的函数
+def extract_order_info(yuyue_id, content):
+    # 未审核通过的页面直接跳过，不做任何解析
+    if not is_approved_page(yuyue_id, content):
         return None
+    order_fields, error = parse_page(current_app.config['ORDER_PARSER'], content)
+    return build_order_data(yuyue_id, order_fields, error)
 
-    return order_data
+# 在线程池或进程池中解析，事件循环只做审核状态判断
+async def extract_order_info_async(yuyue_id, content, batcher):
+    if not is_approved_page(yuyue_id, content):
+        return None
+    try:
+        order_fields, error = await batcher.parse(content)
+    except Exception as e:
+        order_fields, error = None, f"解析任务出错：{e}"
+    return build_order_data(yuyue_id, order_fields, error)
+
+def is_approved_page(yuyue_id, content):
+    if APPROVED_MARKER not in content:
+        # 订单未审核通过或其他状态
+        logger.debug(f"订单 {yuyue_id} 状态不符")
+        return False
+    return True
+
+# 组装订单信息字典
+def build_order_data(yuyue_id, order_fields, error):
+    if error:
+        logger.error(f"{error}，yuyue_id={yuyue_id}")
+        return None
+    logger.debug(f"提取订单 {yuyue_id} 成功")
+    return {'yuyue_id': yuyue_id, **order_fields}
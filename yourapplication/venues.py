@@ -0,0 +1,74 @@
+# yourapplication/venues.py
+
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from flask import current_app
+
+UNKNOWN_VENUE_NAME = '未知场馆'
+# 目录之外的场馆排在最后
+UNKNOWN_VENUE_RANK = 9999
+
+
+@dataclass(frozen=True, slots=True)
+class Venue:
+    id: int  # 上游的 changguan 编号，没有编号的场馆为 None
+    name: str
+    group: str
+    rank: int  # 订单页面中的排序位置
+
+
+# 场馆目录：编号 → 名称 → 分组 → 排序位置，在 create_app 中构建一次，之后只读
+class VenueCatalog:
+    __slots__ = ('venues', 'by_id', 'by_name', 'groups', 'groups_json', 'rank_whens')
+
+    def __init__(self, options, groups):
+        venues = []
+        ids_by_name = {name: venue_id for venue_id, name in options.items()}
+        for group, names in groups.items():
+            for name in names:
+                venues.append(Venue(ids_by_name.get(name), name, group, len(venues)))
+        # 有编号但未分组的场馆排在已分组场馆之后
+        grouped = {venue.name for venue in venues}
+        for venue_id, name in options.items():
+            if name not in grouped:
+                venues.append(Venue(venue_id, name, '', len(venues)))
+
+        self.venues = tuple(venues)
+        self.by_id = MappingProxyType({venue.id: venue for venue in venues if venue.id is not None})
+        self.by_name = MappingProxyType({venue.name: venue for venue in venues})
+        self.groups = MappingProxyType({
+            group: tuple(venue for venue in venues if venue.group == group) for group in groups
+        })
+        self.groups_json = json.dumps(
+            {group: [venue.name for venue in members] for group, members in self.groups.items()},
+            ensure_ascii=False,
+        )
+        # 供 SQL CASE 按场馆名称排序使用的 (名称, 排序位置)
+        self.rank_whens = tuple((venue.name, venue.rank) for venue in venues)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['CHANGGUAN_OPTIONS'], config['VENUE_GROUPS'])
+
+    def name_of(self, venue_id):
+        venue = self.by_id.get(venue_id)
+        return venue.name if venue else UNKNOWN_VENUE_NAME
+
+    # 按名称查找 (编号, 排序位置)，目录之外的场馆为 (None, UNKNOWN_VENUE_RANK)
+    def key_of(self, name):
+        venue = self.by_name.get(name)
+        return (venue.id, venue.rank) if venue else (None, UNKNOWN_VENUE_RANK)
+
+    # 筛选条件对应的排序位置列表，返回 None 表示不进行场馆筛选
+    def ranks_for(self, group, name=''):
+        if not group or group not in self.groups:
+            return None
+        if name:
+            venue = self.by_name.get(name)
+            return [venue.rank] if venue else []
+        return [venue.rank for venue in self.groups[group]]
+
+
+def get_venue_catalog():
+    return current_app.extensions['venues']
@@ -1,19 +1,181 @@
 # yourapplication/views.py
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, current_app, jsonify
+from .fake_pool import get_fake_pool
 from .forms import ReservationForm
-from .models import db, Order, Reservation
-from .utils import update_database_with_range  # 导入新的更新函数
-from faker import Faker
-import requests
+from .metrics import get_metrics
+from .models import db, Order, OrderSlot, PageState, Reservation, TerminalOrder
+from .order_events import get_order_events
+from .utils import (
+    RANGELESS_SYNC_MODES, SYNC_MODES, day_number, delete_order, delete_orders, get_data_version, save_reservation,
+    split_time_slots
+)
+from .upstream import (
+    SAVE_YUYUE_PATH, TUIKUAN_PATH, YUYUE_PATH, UpstreamError, cancel_form_data, extract_yyp_pass, get_upstream,
+    get_yyp_pass_cache, is_accepted, is_token_rejected, reservation_form_data
+)
+from .venues import UNKNOWN_VENUE_RANK, get_venue_catalog
 import re
 import json
+import hashlib
+import queue
 from datetime import datetime
+from sqlalchemy import Integer, case, cast, func, tuple_
 from sqlalchemy.exc import SQLAlchemyError
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 main_bp = Blueprint('main', __name__, template_folder='templates')
-fake = Faker("zh_CN")
+
+# 筛选用的时间，如 "19" 或 "19:00"
+HOUR_RE = re.compile(r'^\s*(\d{1,2})(?::\d{2})?\s*$')
+
+# 无法解析开始小时的时间段排在最后
+UNKNOWN_HOUR = 99
+
+# 不需要范围的同步模式在提示信息中显示的范围
+SYNC_SCOPE_LABELS = {'auto': '自动', 'reservations': '自己提交的预约'}
+
+# 预约列表中的审核状态：状态键 -> (显示文字, 徽章样式)
+RESERVATION_STATUSES = {
+    'approved': ('审核通过', 'success'),
+    'pending': ('待审核', 'warning'),
+    'cancelled': ('已取消', 'secondary'),
+    'unknown': ('未刷新', 'light'),
+}
+
+# 由关联查询的结果得出预约的审核状态：订单表中有记录即审核通过，
+# 否则看终态记录和最近一次抓取的页面状态；页面审核通过但订单已不在库中时状态不明，等待下次刷新
+def reservation_status(has_order, terminal_reason, page_status):
+    if has_order:
+        return 'approved'
+    if terminal_reason == 'cancelled' or page_status == 'terminal':
+        return 'cancelled'
+    if page_status == 'other':
+        return 'pending'
+    return 'unknown'
+
+# 从筛选时间中解析开始小时，不是整点格式时返回 None
+def parse_hour(selected_time):
+    match = HOUR_RE.match(selected_time or '')
+    return int(match.group(1)) if match else None
+
+# 订单时间段的排序键 (场馆顺序, 开始小时, yuyue_id)，也是 /api/orders 的分页游标
+SLOT_HOUR_KEY = func.coalesce(OrderSlot.start_hour, UNKNOWN_HOUR)
+ORDER_SLOT_SORT = (OrderSlot.venue_rank, SLOT_HOUR_KEY, OrderSlot.yuyue_id)
+
+# 查询订单时间段：筛选和排序都在 order_slots 的 (day, venue_rank, start_hour) 索引上完成
+# venue_ranks 为 None 表示不进行场馆筛选
+def order_slot_query(venue_ranks, selected_date, selected_time, *extra_columns):
+    selected_hour = parse_hour(selected_time)
+    query = db.session.query(
+        OrderSlot.yuyue_id, Order.venue, Order.name, Order.phone, OrderSlot.date, OrderSlot.time,
+        *extra_columns
+    ).join(Order, Order.yuyue_id == OrderSlot.yuyue_id)
+    if venue_ranks is not None:
+        query = query.filter(OrderSlot.venue_rank.in_(venue_ranks))
+    if selected_date:
+        query = query.filter(date_filter(OrderSlot, selected_date))
+    if selected_hour is not None:
+        query = query.filter(OrderSlot.start_hour == selected_hour)
+    elif selected_time:
+        query = query.filter(OrderSlot.time.contains(selected_time))
+    return query
+
+# 按日期筛选：能解析的日期按整数序数比较，否则按原来的日期文字比较
+def date_filter(model, selected_date):
+    day = day_number(selected_date)
+    return model.day == day if day is not None else model.date == selected_date
+
+# 推送订单变更时，按页面的筛选条件（与 order_slot_query 相同）得出订单要显示的时间段行
+# sort 为页面表格中的排序键 (场馆顺序, 开始小时, yuyue_id)
+def order_slot_rows(order_data, catalog, venue_ranks, selected_date, selected_time):
+    _, venue_rank = catalog.key_of(order_data['venue'])
+    if venue_ranks is not None and venue_rank not in venue_ranks:
+        return []
+    if selected_date:
+        day = day_number(selected_date)
+        matches = day_number(order_data['date']) == day if day is not None else order_data['date'] == selected_date
+        if not matches:
+            return []
+    selected_hour = parse_hour(selected_time)
+    rows = []
+    for slot, start_hour in split_time_slots(order_data['time']):
+        if selected_hour is not None and start_hour != selected_hour:
+            continue
+        if selected_hour is None and selected_time and selected_time not in slot:
+            continue
+        rows.append({
+            'yuyue_id': order_data['yuyue_id'],
+            'venue': order_data['venue'],
+            'name': order_data['name'],
+            'phone': order_data['phone'],
+            'date': order_data['date'],
+            'time': slot,
+            'sort': [venue_rank, UNKNOWN_HOUR if start_hour is None else start_hour, order_data['yuyue_id']],
+        })
+    return rows
+
+def sse_message(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 分页游标格式为 "场馆顺序:开始小时:yuyue_id"
+def parse_cursor(cursor):
+    parts = cursor.split(':')
+    if len(parts) != 3:
+        raise ValueError(cursor)
+    return tuple(int(part) for part in parts)
+
+# 查询一页订单，结果只依赖参数和数据版本，可以直接缓存
+def query_orders_page(venue_ranks, selected_date, selected_time, cursor, limit):
+    query = order_slot_query(venue_ranks, selected_date, selected_time,
+                             OrderSlot.venue_rank, SLOT_HOUR_KEY.label('hour_key'))
+    if cursor:
+        query = query.filter(tuple_(*ORDER_SLOT_SORT) > tuple_(*cursor))
+    rows = query.order_by(*ORDER_SLOT_SORT).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = f"{last.venue_rank}:{last.hour_key}:{last.yuyue_id}"
+    items = [
+        {
+            'yuyue_id': row.yuyue_id,
+            'venue': row.venue,
+            'name': row.name,
+            'phone': row.phone,
+            'date': row.date,
+            'time': row.time,
+        }
+        for row in rows
+    ]
+    return {'items': items, 'next_cursor': next_cursor}
+
+# 从上游预约页面获取 yyp_pass，使用重试机制，失败时返回 None
+def fetch_yyp_pass(upstream, yuyue_changguan, retries=5, delay=0.2):
+    for attempt in range(retries):
+        try:
+            response = upstream.get('yuyue', YUYUE_PATH, params={'id': yuyue_changguan})
+            yyp_pass = extract_yyp_pass(response.text)
+            if yyp_pass:
+                return yyp_pass
+            current_app.logger.warning(f"获取 yyp_pass 失败, 重试 {attempt + 1}/{retries}")
+        except UpstreamError as e:
+            current_app.logger.error(f"获取 yyp_pass 请求出错: {e}")
+        time.sleep(delay)  # 等待指定时间后再重试
+    return None
+
+# 预约回复表明 yyp_pass 失效，需要重新获取后再提交
+def is_token_rejected_response(response):
+    try:
+        return is_token_rejected(response.json(), current_app.config['YYP_PASS_INVALID_MARKERS'])
+    except ValueError:
+        return False
+
+# 上游回复中的提示信息，回复不是 JSON 对象时返回 default
+def upstream_message(json_data, default):
+    return json_data.get('Msg', default) if isinstance(json_data, dict) else default
 
 @main_bp.route('/', methods=['GET', 'POST'])
 def index():
@@ -21,8 +183,8 @@ def index():
     if form.validate_on_submit():
         try:
             # 获取表单数据
-            yuyue_name = form.yuyue_name.data.strip() or fake.name()
-            yuyue_hp = form.yuyue_hp.data.strip() or fake.phone_number()
+            yuyue_name = form.yuyue_name.data.strip() or get_fake_pool().name()
+            yuyue_hp = form.yuyue_hp.data.strip() or get_fake_pool().phone_number()
             yuyue_time = str(form.yuyue_time.data)
             yuyue_riqi = form.yuyue_riqi.data.strftime('%Y-%m-%d')
             yuyue_changguan = form.yuyue_changguan.data
@@ -30,78 +192,61 @@ def index():
             # 根据姓名获取对应的 openid
             yuyue_openid = current_app.config['NAME_OPENID_MAP'].get(yuyue_name, current_app.config['DEFAULT_OPENID'])
 
-            # 获取 yyp_pass，使用重试机制
-            pass_url = f"https://cgyytyb.cpu.edu.cn/wap/yuyue?id={yuyue_changguan}"
-            retries = 5
-            delay = 0.2
-            yyp_pass = None
-            for attempt in range(retries):
-                try:
-                    response = requests.get(pass_url, headers=current_app.config['HEADERS'], timeout=10)
-                    response.raise_for_status()
-                    yyp_pass = extract_yyp_pass(response.text)
-                    if yyp_pass:
-                        break  # 成功获取到 yyp_pass，跳出循环
-                    else:
-                        current_app.logger.warning(f"获取 yyp_pass 失败, 重试 {attempt + 1}/{retries}")
-                except requests.RequestException as e:
-                    current_app.logger.error(f"获取 yyp_pass 请求出错: {e}")
-                time.sleep(delay)  # 等待指定时间后再重试
+            upstream = get_upstream()
+            token_cache = get_yyp_pass_cache()
+
+            # 获取 yyp_pass，有效期内复用缓存，同一场馆的并发提交共用一次获取
+            def fetch_token():
+                return fetch_yyp_pass(upstream, yuyue_changguan)
+            yyp_pass, cached = token_cache.get(yuyue_changguan, fetch_token)
 
             if not yyp_pass:
                 flash("无法获取预约密钥，请稍后再试。", "danger")
                 return redirect(url_for('main.index'))
 
             # 构建预约数据
-            data = {
-                'isWeb': 1,
-                'API': 'saveYuyue',
-                'noSave': 'yuyue_id',
-                'back': 'yuyue_id',
-                'yyp_pass': yyp_pass,
-                'yuyue_riqi': yuyue_riqi,
-                'yuyue_time': yuyue_time,
-                'yuyue_name': yuyue_name,
-                'yuyue_hp': yuyue_hp,
-                'yuyue_view': -1,
-                'yuyue_changguan': yuyue_changguan,
-                'yuyue_openid': yuyue_openid,
-                'yuyue_chengren': 1
-            }
-
-            # 发送预约请求
-            reserve_url = "https://cgyytyb.cpu.edu.cn/inc/ajax/save/saveYuyue"
-            try:
-                response = requests.post(reserve_url, headers=current_app.config['HEADERS'], data=data, timeout=10)
-                response.raise_for_status()
-            except requests.RequestException as e:
-                current_app.logger.error(f"发送预约请求时出错：{e}")
-                flash("发送预约请求失败，请稍后再试。", "danger")
-                return redirect(url_for('main.index'))
+            data = reservation_form_data(yyp_pass, yuyue_riqi, yuyue_time, yuyue_name, yuyue_hp,
+                                         yuyue_changguan, yuyue_openid)
+
+            # 发送预约请求；上游提示 yyp_pass 失效时作废缓存，若它来自缓存则重新获取后再试一次，
+            # 其他拒绝直接返回给用户，不重复提交
+            while True:
+                try:
+                    response = upstream.post('saveYuyue', SAVE_YUYUE_PATH, data=data)
+                except UpstreamError as e:
+                    current_app.logger.error(f"发送预约请求时出错：{e}")
+                    flash("发送预约请求失败，请稍后再试。", "danger")
+                    return redirect(url_for('main.index'))
+                if not is_token_rejected_response(response):
+                    break
+                token_cache.invalidate(yuyue_changguan, yyp_pass)
+                if not cached:
+                    break
+                current_app.logger.warning(f"缓存的 yyp_pass 被拒绝，重新获取：{response.text}")
+                yyp_pass, cached = token_cache.get(yuyue_changguan, fetch_token)
+                if not yyp_pass:
+                    break
+                data['yyp_pass'] = yyp_pass
 
             try:
                 json_data = response.json()
                 server_response = json.dumps(json_data, ensure_ascii=False, indent=4)
+                if not is_accepted(json_data):
+                    msg = upstream_message(json_data, '预约失败。')
+                    current_app.logger.error(f"预约失败：{msg}")
+                    flash(f"预约失败：{msg}", "danger")
+                    return redirect(url_for('main.index'))
                 yuyue_id = int(json_data['data']['yuyue_id'])
-            except (ValueError, KeyError) as e:
+            except (ValueError, KeyError, TypeError) as e:
                 current_app.logger.error(f"解析服务器响应时出错：{e}")
                 server_response = response.text
                 flash("预约失败，无法解析服务器响应。", "danger")
                 return redirect(url_for('main.index'))
 
             # 保存预约到数据库
-            reservation = Reservation(
-                yuyue_id=yuyue_id,
-                venue=current_app.config['CHANGGUAN_OPTIONS'].get(yuyue_changguan, "未知场馆"),
-                name=yuyue_name,
-                phone=yuyue_hp,
-                date=yuyue_riqi,
-                time=yuyue_time
-            )
             try:
-                db.session.add(reservation)
-                db.session.commit()
-                current_app.logger.info(f"保存预约 {yuyue_id}")
+                save_reservation(yuyue_id, get_venue_catalog().name_of(yuyue_changguan),
+                                 yuyue_name, yuyue_hp, yuyue_riqi, yuyue_time)
             except SQLAlchemyError as e:
                 db.session.rollback()
                 current_app.logger.error(f"保存预约 {yuyue_id} 时出错：{e}")
@@ -112,7 +257,7 @@ def index():
                                    yuyue_name=yuyue_name,
                                    yuyue_time=yuyue_time,
                                    yuyue_hp=yuyue_hp,
-                                   yuyue_changguan=current_app.config['CHANGGUAN_OPTIONS'].get(yuyue_changguan, "未知场馆"),
+                                   yuyue_changguan=get_venue_catalog().name_of(yuyue_changguan),
                                    yuyue_riqi=yuyue_riqi,
                                    server_response=server_response)
         except Exception as e:
@@ -125,202 +270,301 @@ def index():
             for field_errors in form.errors.values():
                 for error in field_errors:
                     flash(error, "danger")
-    return render_template('index.html', form=form)
+    sync_jobs = current_app.extensions['sync_jobs'].recent()
+    return render_template('index.html', form=form, sync_jobs=sync_jobs)
 
 # 新增更新数据库的路由
 @main_bp.route('/update_orders', methods=['POST'])
 def update_orders():
     start_id = request.form.get('start_id')
     end_id = request.form.get('end_id')
-    if not start_id or not end_id:
+    mode = request.form.get('mode', 'incremental')
+    if mode not in SYNC_MODES:
+        flash("无效的更新模式。", "danger")
+        return redirect(url_for('main.index'))
+    if mode in RANGELESS_SYNC_MODES:
+        # 自动模式从水位线开始扫描，预约刷新模式只抓取自己提交的订单，都不需要指定范围
+        start_id = end_id = None
+    elif not start_id or not end_id:
         flash("请输入起始和结束的预约ID。", "danger")
         return redirect(url_for('main.index'))
-
-    try:
-        start_id = int(start_id)
-        end_id = int(end_id)
-        if start_id > end_id:
-            flash("起始ID不能大于结束ID。", "danger")
-            return redirect(url_for('main.index'))
-        if end_id - start_id > 1000:
-            flash("一次最多只能查询1000个预约ID的范围。", "danger")
+    else:
+        try:
+            start_id = int(start_id)
+            end_id = int(end_id)
+            if start_id > end_id:
+                flash("起始ID不能大于结束ID。", "danger")
+                return redirect(url_for('main.index'))
+            # replay 只读本地归档，不受单次范围限制
+            max_range = current_app.config['SYNC_MAX_RANGE']
+            if mode != 'replay' and end_id - start_id > max_range:
+                flash(f"一次最多只能查询{max_range}个预约ID的范围。", "danger")
+                return redirect(url_for('main.index'))
+        except ValueError:
+            flash("请输入有效的数字作为预约ID。", "danger")
             return redirect(url_for('main.index'))
-    except ValueError:
-        flash("请输入有效的数字作为预约ID。", "danger")
-        return redirect(url_for('main.index'))
-
-    try:
-        # 调用 utils.py 中的函数更新数据库
-        update_database_with_range(start_id, end_id)
-        flash(f"数据库已更新，范围：{start_id} - {end_id}", "success")
-    except Exception as e:
-        current_app.logger.error(f"更新数据库时出错：{e}")
-        flash("更新数据库时发生错误，请查看日志。", "danger")
 
+    submit_sync_job(mode, start_id, end_id)
     return redirect(url_for('main.index'))
 
+# 提交到后台任务队列，请求立即返回，进度通过任务状态接口查询
+def submit_sync_job(mode, start_id=None, end_id=None):
+    job, created = current_app.extensions['sync_jobs'].submit(mode, start_id, end_id)
+    scope = SYNC_SCOPE_LABELS.get(mode) or f"{job.start_id} - {job.end_id}"
+    if created:
+        current_app.logger.info(f"提交后台同步任务 {job.id}，范围：{scope}，模式：{mode}")
+        flash(f"已提交后台更新任务 {job.id}，范围：{scope}", "success")
+    else:
+        flash(f"范围与进行中的任务 {job.id} 重叠，已合并到该任务，范围：{scope}", "info")
+    return job
+
+# 只刷新自己提交的预约的审核状态，几十个请求即可完成，完成后回到订单页面查看
+@main_bp.route('/reservations/refresh', methods=['POST'])
+def refresh_reservations():
+    submit_sync_job('reservations')
+    return redirect(url_for('main.view_orders', **request.args))
+
+# 查询后台同步任务的状态和进度
+@main_bp.route('/update_orders/<job_id>')
+def update_orders_status(job_id):
+    job = current_app.extensions['sync_jobs'].get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(job.as_dict())
+
+# 最近的后台同步任务列表
+@main_bp.route('/update_orders/jobs')
+def update_orders_jobs():
+    return jsonify([job.as_dict() for job in current_app.extensions['sync_jobs'].recent()])
+
+# 预约、取消等上游接口的调用次数和耗时统计
+@main_bp.route('/api/upstream_stats')
+def upstream_stats():
+    stats = get_upstream().stats_snapshot()
+    stats['yyp_pass_cache'] = get_yyp_pass_cache().stats_snapshot()
+    return jsonify(stats)
+
+# Prometheus 文本格式的指标
+@main_bp.route('/metrics')
+def metrics():
+    registry = get_metrics()
+    if registry is None:
+        return jsonify({'error': '未启用指标'}), 404
+    return registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @main_bp.route('/orders')
 def view_orders():
-    # 定义场馆分组（保持不变）
-    venue_groups = {
-        '体育馆三楼羽毛球馆': [
-            '体育馆三楼羽毛球馆1号场',
-            '体育馆三楼羽毛球馆2号场',
-            '体育馆三楼羽毛球馆3号场',
-            '体育馆三楼羽毛球馆4号场',
-            '体育馆三楼羽毛球馆5号场',
-            '体育馆三楼羽毛球馆6号场',
-            '体育馆三楼羽毛球馆7号场'
-        ],
-        '体育馆一楼羽毛球馆': [
-            '体育馆一楼羽毛球馆1号场',
-            '体育馆一楼羽毛球馆2号场',
-            '体育馆一楼羽毛球馆3号场',
-            '体育馆一楼羽毛球馆4号场',
-            '体育馆一楼羽毛球馆5号场',
-            '体育馆一楼羽毛球馆6号场'
-        ],
-        '教室': [
-            '体育馆一楼教室一',
-            '体育馆一楼教室二',
-            '体育馆一楼教室三',
-            '体育馆四楼教室四',
-            '体育场形体房',
-            '体育场跆拳道房'
-        ],
-        '田径场健身房': [
-            '田径场健身房'
-        ]
-    }
-
-    # 建立实际场馆到分组场馆的映射
-    venue_mapping = {}
-    for group_name, venues in venue_groups.items():
-        for v in venues:
-            venue_mapping[v] = group_name
-
     selected_group = request.args.get('venue_group', '')
     selected_venue = request.args.get('venue', '')
     selected_date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
     selected_time = request.args.get('time', '')
 
-    # 根据选择的场馆分组获取具体场馆
-    if selected_group and selected_group in venue_groups:
-        if selected_venue:
-            selected_venues = [selected_venue]
-        else:
-            selected_venues = venue_groups[selected_group]
-    else:
-        selected_venues = None  # 表示不进行场馆筛选
-
-    # 查询订单
-    query = Order.query
-    if selected_venues:
-        query = query.filter(Order.venue.in_(selected_venues))
-    if selected_date:
-        query = query.filter(Order.date == selected_date)
-    if selected_time:
-        query = query.filter(Order.time.like(f"%{selected_time}%"))
-
-    orders = query.order_by(Order.venue, Order.time).all()
-
-    # 查询预约
-    reservations_query = Reservation.query.filter_by(date=selected_date)
-    if selected_venues:
+    catalog = get_venue_catalog()
+    venue_ranks = catalog.ranks_for(selected_group, selected_venue)
+    selected_hour = parse_hour(selected_time)
+
+    # 先记下推送的事件序号再查询，查询期间的变更会在页面连上推送后补发
+    broker = get_order_events()
+    order_events_since = broker.last_seq if broker is not None else None
+
+    orders = order_slot_query(venue_ranks, selected_date, selected_time,
+                              OrderSlot.venue_rank, SLOT_HOUR_KEY.label('hour_key')).order_by(*ORDER_SLOT_SORT).all()
+
+    # 查询预约，关联订单表、终态记录和页面指纹得出审核状态
+    reservations_query = (
+        Reservation.query.filter(date_filter(Reservation, selected_date))
+        .outerjoin(Order, Order.yuyue_id == Reservation.yuyue_id)
+        .outerjoin(TerminalOrder, TerminalOrder.yuyue_id == Reservation.yuyue_id)
+        .outerjoin(PageState, PageState.yuyue_id == Reservation.yuyue_id)
+        .add_columns(Order.yuyue_id.is_not(None), TerminalOrder.reason, PageState.status, PageState.fetched_at)
+    )
+    if venue_ranks is not None:
+        selected_venues = [venue.name for venue in catalog.venues if venue.rank in venue_ranks]
         reservations_query = reservations_query.filter(Reservation.venue.in_(selected_venues))
-    if selected_time:
+    if selected_hour is not None:
+        reservations_query = reservations_query.filter(Reservation.time == str(selected_hour))
+    elif selected_time:
         reservations_query = reservations_query.filter(Reservation.time.like(f"%{selected_time}%"))
 
-    reservations = reservations_query.order_by(Reservation.venue, Reservation.time).all()
-
-    # 获取所有场馆分组名称，供筛选使用
-    all_venue_groups = list(venue_groups.keys())
-
-    # 处理订单数据，拆分时间段
-    processed_orders = []
-    for order in orders:
-        yuyue_id = order.yuyue_id
-        venue = order.venue
-        grouped_venue = venue_mapping.get(venue, venue)
-        times = [t.strip() for t in order.time.split(';') if t.strip()]
-        for time in times:
-            # 如果有时间筛选，检查是否匹配
-            if selected_time and selected_time not in time:
-                continue
-            processed_orders.append({
-                'yuyue_id': yuyue_id,
-                'venue': venue,
-                'grouped_venue': grouped_venue,
-                'name': order.name,
-                'phone': order.phone,
-                'date': order.date,
-                'time': time
-            })
-
-    # 定义排序键函数
-    venue_order = [
-        '体育馆三楼羽毛球馆1号场',
-        '体育馆三楼羽毛球馆2号场',
-        '体育馆三楼羽毛球馆3号场',
-        '体育馆三楼羽毛球馆4号场',
-        '体育馆三楼羽毛球馆5号场',
-        '体育馆三楼羽毛球馆6号场',
-        '体育馆三楼羽毛球馆7号场',
-        '体育馆一楼羽毛球馆1号场',
-        '体育馆一楼羽毛球馆2号场',
-        '体育馆一楼羽毛球馆3号场',
-        '体育馆一楼羽毛球馆4号场',
-        '体育馆一楼羽毛球馆5号场',
-        '体育馆一楼羽毛球馆6号场',
-        '体育馆一楼教室一',
-        '体育馆一楼教室二',
-        '体育馆一楼教室三',
-        '体育馆四楼教室四',
-        '体育场形体房',
-        '体育场跆拳道房',
-        '田径场健身房',
-        # 其他场馆可以按需添加
+    reservations = [
+        (reservation, reservation_status(has_order, terminal_reason, page_status), checked_at)
+        for reservation, has_order, terminal_reason, page_status, checked_at in reservations_query.order_by(
+            case(*catalog.rank_whens, value=Reservation.venue, else_=UNKNOWN_VENUE_RANK),
+            cast(Reservation.time, Integer),
+        )
     ]
-    venue_order_index = {venue: index for index, venue in enumerate(venue_order)}
 
-    def sorting_key(order):
-        venue_index = venue_order_index.get(order['venue'], 9999)  # 未知场馆放在最后
-        try:
-            hour = int(order['time'].split(':')[0])
-        except:
-            hour = 9999
-        return (venue_index, hour)
-
-    # 按照指定顺序排序
-    processed_orders.sort(key=sorting_key)
-
-    # 处理预约记录
-    processed_reservations = []
-    for res in reservations:
-        grouped_venue = venue_mapping.get(res.venue, res.venue)
-        processed_reservations.append({
-            'yuyue_id': res.yuyue_id,
-            'venue': res.venue,
-            'grouped_venue': grouped_venue,
-            'name': res.name,
-            'phone': res.phone,
-            'date': res.date,
-            'time': res.time
-        })
-
-    # 对预约记录进行排序
-    processed_reservations.sort(key=sorting_key)
+    # 获取所有场馆分组名称，供筛选使用
+    all_venue_groups = list(catalog.groups)
 
     return render_template('orders.html',
-                           orders=processed_orders,
-                           reservations=processed_reservations,
+                           orders=orders,
+                           reservations=reservations,
+                           reservation_statuses=RESERVATION_STATUSES,
+                           order_events_since=order_events_since,
                            selected_group=selected_group,
                            selected_venue=selected_venue,
                            selected_date=selected_date,
                            selected_time=selected_time,
                            all_venue_groups=all_venue_groups,
-                           venue_groups=venue_groups)
-
+                           venue_groups=catalog.groups,
+                           venue_groups_json=catalog.groups_json)
+
+# 订单变更推送（Server-Sent Events），筛选参数与 /orders 相同，只推送与筛选条件相关的行
+# orders 事件：先删除页面中 ids 对应的行，再按 sort 插入 rows；reset 事件：页面整体刷新
+# 断线重连时浏览器带上 Last-Event-ID，首次连接用 since 参数（页面渲染时的事件序号）
+@main_bp.route('/orders/stream')
+def order_stream():
+    broker = get_order_events()
+    if broker is None:
+        return jsonify({'error': '未启用订单推送'}), 404
+    selected_group = request.args.get('venue_group', '')
+    selected_venue = request.args.get('venue', '')
+    selected_date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+    selected_time = request.args.get('time', '')
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since', ''))
+    except ValueError:
+        since = None
+
+    subscriber = broker.subscribe(since)
+    if subscriber is None:
+        return jsonify({'error': '推送连接数已达上限'}), 503
+    catalog = get_venue_catalog()
+    venue_ranks = catalog.ranks_for(selected_group, selected_venue)
+    heartbeat = current_app.config['ORDER_EVENTS_HEARTBEAT']
+
+    # 生成器在请求结束后才执行，不使用应用上下文和数据库会话；客户端断开时写入失败，生成器退出
+    def generate():
+        while True:
+            if subscriber.overflowed:
+                yield sse_message(broker.last_seq, 'reset', {})
+                return
+            try:
+                event = subscriber.events.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if event.kind == 'reset':
+                yield sse_message(event.seq, 'reset', {})
+                return
+            rows = []
+            for order_data in event.upserted:
+                rows.extend(order_slot_rows(order_data, catalog, venue_ranks, selected_date, selected_time))
+            ids = [order_data['yuyue_id'] for order_data in event.upserted] + list(event.removed)
+            yield sse_message(event.seq, 'orders', {'ids': ids, 'rows': rows})
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # 在响应关闭时取消订阅：客户端在第一段数据发出前断开时生成器从未开始执行，其中的 finally 不会运行
+    response.call_on_close(lambda: broker.unsubscribe(subscriber))
+    return response
+
+# 订单列表的 JSON 接口，按 (场馆顺序, 开始小时, yuyue_id) 做游标分页
+# ETag 取自订单数据版本，数据未变化时轮询直接返回 304
+@main_bp.route('/api/orders', methods=['GET'])
+def api_orders():
+    config = current_app.config
+    selected_group = request.args.get('venue_group', '')
+    selected_venue = request.args.get('venue', '')
+    selected_date = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+    selected_time = request.args.get('time', '')
+    cursor_arg = request.args.get('cursor', '')
+    try:
+        cursor = parse_cursor(cursor_arg) if cursor_arg else None
+        limit = int(request.args.get('limit', config['API_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'error': '无效的分页参数'}), 400
+    limit = max(1, min(limit, config['API_MAX_PAGE_SIZE']))
+
+    version = get_data_version()
+    venue_ranks = get_venue_catalog().ranks_for(selected_group, selected_venue)
+    # 缓存键和 ETag 都由数据版本和实际生效的筛选条件（场馆排序位置、补全后的日期、时间、分页）组成，
+    # 不带日期参数的请求在跨天后也会得到新的 ETag
+    filters = (None if venue_ranks is None else tuple(venue_ranks), selected_date, selected_time, cursor, limit)
+    etag = f"orders-{version}-{hashlib.sha1(repr(filters).encode('utf-8')).hexdigest()[:16]}"
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    cache = current_app.extensions['orders_cache']
+    key = (version, *filters)
+    page = cache.get(key)
+    if page is None:
+        page = query_orders_page(venue_ranks, selected_date, selected_time, cursor, limit)
+        cache.set(key, page)
+
+    response = jsonify(dict(page, version=version, count=len(page['items'])))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# 并发向上游发送 tuikuan 请求，返回每个 yuyue_id 的结果，顺序与输入一致
+def cancel_upstream_batch(yuyue_ids, concurrency):
+    app = current_app._get_current_object()
+    upstream = get_upstream()
+
+    def cancel_one(yuyue_id):
+        result = {'yuyue_id': yuyue_id, 'cancelled': False, 'deleted': False, 'error': None}
+        try:
+            response = upstream.post('tuikuan', TUIKUAN_PATH, data=cancel_form_data(yuyue_id))
+            json_data = response.json()
+            if is_accepted(json_data):
+                result['cancelled'] = True
+            else:
+                result['error'] = upstream_message(json_data, '取消订单失败。')
+                app.logger.error(f"取消订单 {yuyue_id} 失败：{result['error']}")
+        except UpstreamError as e:
+            result['error'] = '取消订单请求失败'
+            app.logger.error(f"发送取消请求时出错：{e}")
+        except (ValueError, AttributeError):
+            result['error'] = '无法解析服务器响应'
+            app.logger.error(f"取消订单 {yuyue_id} 时解析响应失败。")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(yuyue_ids))), thread_name_prefix='tuikuan') as executor:
+        return list(executor.map(cancel_one, yuyue_ids))
+
+# 批量取消订单：参数为 JSON {"yuyue_ids": [...]} 或表单中的多个 yuyue_ids
+# 上游取消成功的订单在一个事务中从数据库删除，返回每个 ID 的结果
+@main_bp.route('/api/cancel_orders', methods=['POST'])
+def cancel_orders():
+    config = current_app.config
+    payload = request.get_json(silent=True)
+    raw_ids = payload.get('yuyue_ids') if isinstance(payload, dict) else request.form.getlist('yuyue_ids')
+    try:
+        yuyue_ids = list(dict.fromkeys(int(yuyue_id) for yuyue_id in raw_ids or []))
+    except (TypeError, ValueError):
+        return jsonify({'error': '无效的预约ID'}), 400
+    if not yuyue_ids:
+        return jsonify({'error': '请选择要取消的订单'}), 400
+    if len(yuyue_ids) > config['BATCH_CANCEL_MAX_IDS']:
+        return jsonify({'error': f"一次最多取消 {config['BATCH_CANCEL_MAX_IDS']} 个订单"}), 400
+
+    results = cancel_upstream_batch(yuyue_ids, config['BATCH_CANCEL_CONCURRENCY'])
+    cancelled_ids = [result['yuyue_id'] for result in results if result['cancelled']]
+    status = 200
+    try:
+        deleted_ids = delete_orders(cancelled_ids) if cancelled_ids else set()
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"批量取消订单时数据库错误：{e}")
+        deleted_ids = set()
+        status = 500
+        for result in results:
+            if result['cancelled']:
+                result['error'] = '数据库错误'
+    for result in results:
+        result['deleted'] = result['yuyue_id'] in deleted_ids
+
+    return jsonify({
+        'requested': len(yuyue_ids),
+        'cancelled': len(cancelled_ids),
+        'deleted': len(deleted_ids),
+        'failed': len(yuyue_ids) - len(cancelled_ids),
+        'results': results,
+    }), status
 
 @main_bp.route('/cancel_order/<int:yuyue_id>', methods=['POST'])
 def cancel_order(yuyue_id):
@@ -331,39 +575,23 @@ def cancel_order(yuyue_id):
     time = request.form.get('time', '')
 
     try:
-        # 取消订单的请求 URL
-        cancel_url = "https://cgyytyb.cpu.edu.cn/inc/ajax/save/tuikuan"
-
-        # 取消订单的数据
-        data = {
-            'isWeb': 1,
-            'tuikuan_id': yuyue_id,  # 退款ID，即 yuyue_id
-            'API': 'tuikuan',
-            'tuikuanflag': 'yuyue'
-        }
-
         # 发送取消订单的 POST 请求
-        response = requests.post(cancel_url, headers=current_app.config['HEADERS'], data=data, timeout=10)
-        response.raise_for_status()
+        response = get_upstream().post('tuikuan', TUIKUAN_PATH, data=cancel_form_data(yuyue_id))
 
         # 解析响应
         json_data = response.json()
-        if json_data.get('Code') == '0':
+        if is_accepted(json_data):
             # 取消成功，删除订单
-            order = Order.query.filter_by(yuyue_id=yuyue_id).first()
-            if order:
-                db.session.delete(order)
-                db.session.commit()
+            if delete_order(yuyue_id):
                 flash("订单已成功取消。", "success")
-                current_app.logger.info(f"取消订单 {yuyue_id}")
             else:
                 flash("订单未找到。", "warning")
         else:
             # 取消失败
-            msg = json_data.get('Msg', '取消订单失败。')
+            msg = upstream_message(json_data, '取消订单失败。')
             flash(f"取消订单失败：{msg}", "danger")
             current_app.logger.error(f"取消订单 {yuyue_id} 失败：{msg}")
-    except requests.RequestException as e:
+    except UpstreamError as e:
         current_app.logger.error(f"发送取消请求时出错：{e}")
         flash("取消订单请求失败，请稍后再试。", "danger")
     except (ValueError, KeyError):